@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+from tentacle.bitboard import BitBoard
+from tentacle.board import Board
+
+
+def random_game(board_cls, rng):
+    '''
+    Returns:
+    ------------
+    boards : list(Board)
+        every position of a random game, from the empty board to the end
+    '''
+    boards = [board_cls()]
+    who = Board.STONE_BLACK
+    for loc in rng.permutation(Board.BOARD_SIZE_SQ):
+        b = boards[-1].child(loc, who)
+        boards.append(b)
+        over, _, _ = b.is_over(boards[-2])
+        if over:
+            break
+        who = Board.oppo(who)
+    return boards
+
+
+def bench_is_over(board_cls, games, seed=0):
+    rng = np.random.RandomState(seed)
+    plies = 0
+    cost = 0.
+    for _ in range(games):
+        boards = random_game(board_cls, rng)
+        begin = time.time()
+        for old, new in zip(boards[:-1], boards[1:]):
+            new.is_over(old)
+        cost += time.time() - begin
+        plies += len(boards) - 1
+    return plies, cost
+
+
+def bench_play(board_cls, games, seed=0):
+    rng = np.random.RandomState(seed)
+    begin = time.time()
+    plies = sum(len(random_game(board_cls, rng)) - 1 for _ in range(games))
+    return plies, time.time() - begin
+
+
+if __name__ == '__main__':
+    games = 200
+    for name, bench in (('is_over', bench_is_over), ('play', bench_play)):
+        base = None
+        for board_cls in (Board, BitBoard):
+            plies, cost = bench(board_cls, games)
+            base = base or cost
+            print('%-8s %-8s plies: %6d, time: %7.3fs, per ply: %7.2fus, speedup: %5.1fx' %
+                  (name, board_cls.__name__, plies, cost, cost / plies * 1e6, base / cost))
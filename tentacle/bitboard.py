@@ -0,0 +1,96 @@
+import numpy as np
+from tentacle.board import Board
+
+
+class BitBoard(Board):
+    '''
+    board state kept as one bitboard (a python int) per colour besides stones
+
+    Cells are laid out row by row with one extra guard column, so a shift by
+    1, N+1, N+2 or N moves along a row, a column, a diagonal or a counter
+    diagonal without wrapping to the next row. Only the line segments through
+    the placed stone are tested, which keeps is_over O(1).
+
+    Attributes:
+    ------------------
+    bits : list(int)
+        bitboards indexed by stone colour, bits[0] is unused
+    '''
+
+    def _sync(self):
+        super()._sync()
+        bit, _, _ = BitBoard._table()
+        self.bits = [0, 0, 0]
+        for loc in np.flatnonzero(self._stones):
+            self.bits[self._stones[loc]] |= 1 << bit[loc]
+
+    def _place(self, loc, who):
+        super()._place(loc, who)
+        bit, _, _ = BitBoard._table()
+        self.bits[who] |= 1 << bit[loc]
+
+    def _remove(self, loc):
+        bit, _, _ = BitBoard._table()
+        self.bits[self._stones[loc]] &= ~(1 << bit[loc])
+        super()._remove(loc)
+
+    def copy(self):
+        b = super().copy()
+        b.bits = list(self.bits)
+        return b
+
+    def _changed_loc(self, old_board):
+        loc = self.last_loc
+        if loc is None or not isinstance(old_board, BitBoard) or self._stones[loc] == Board.STONE_EMPTY:
+            return super()._changed_loc(old_board)
+        bit, _, _ = BitBoard._table()
+        who = self._stones[loc]
+        if old_board.bits[who] ^ self.bits[who] != 1 << bit[loc] or \
+                old_board.bits[Board.oppo(who)] != self.bits[Board.oppo(who)]:
+            return super()._changed_loc(old_board)  # not a single new stone, let it raise
+        return loc
+
+    def _is_five_at(self, loc, who):
+        _, shifts, masks = BitBoard._table()
+        b = self.bits[who]
+        for d, mask in zip(shifts, masks[loc]):
+            m = b & mask
+            m2 = m & (m >> d)
+            m4 = m2 & (m2 >> (2 * d))
+            if m4 & (m >> (4 * d)):
+                return True
+        return False
+
+    @staticmethod
+    def _table():
+        '''
+        Returns:
+        ------------
+        bit : list(int)
+            bit position of each location
+        shifts : tuple(int)
+            the shift of one step along row, column, diagonal, counter diagonal
+        masks : list(tuple(int))
+            for each location, the 9-cell segment centred on it in every direction
+        '''
+        def build():
+            size = Board.BOARD_SIZE
+            width = size + 1
+            bit = [r * width + c for r in range(size) for c in range(size)]
+            steps = ((0, 1), (1, 0), (1, 1), (1, -1))
+            shifts = tuple(dr * width + dc for dr, dc in steps)
+            reach = Board.WIN_STONE_NUM - 1
+            masks = []
+            for r in range(size):
+                for c in range(size):
+                    segs = []
+                    for dr, dc in steps:
+                        seg = 0
+                        for k in range(-reach, reach + 1):
+                            y, x = r + k * dr, c + k * dc
+                            if 0 <= y < size and 0 <= x < size:
+                                seg |= 1 << (y * width + x)
+                        segs.append(seg)
+                    masks.append(tuple(segs))
+            return bit, shifts, masks
+        return Board._cached('bitboard', build)
@@ -1,5 +1,5 @@
 
-
+import copy
 
 import numpy as np
 
@@ -24,12 +24,535 @@ class Board(object):
                    STONE_WHITE: np.ones(WIN_STONE_NUM, dtype=int) * STONE_WHITE}
     BOARD_SIZE = 15
     BOARD_SIZE_SQ = BOARD_SIZE ** 2
+    ZOBRIST_SEED = 5
+    NEAR_RADIUS = 2
+    SHAPE_MEMO_LIMIT = 1 << 18
+
+    _tables = {}
+    _shape_memo = {}
 
     def __init__(self):
-        self.stones = np.zeros(Board.BOARD_SIZE_SQ, np.int)
         self.over = False
         self.winner = Board.STONE_EMPTY
         self.exploration = False
+        self.stones = np.zeros(Board.BOARD_SIZE_SQ, np.int)
+
+    @property
+    def stones(self):
+        return self._stones
+
+    @stones.setter
+    def stones(self, stones):
+        self._stones = stones
+        self._sync()
+
+    def _sync(self):
+        '''rebuild whatever is derived from stones, called when stones is replaced'''
+        self.last_loc = None
+        self.counts = np.bincount(self._stones, minlength=3).tolist()
+        self.history = []
+        self._hashes = Board.hash_batch(self._stones[Board.symmetries()[0]]).tolist()
+        self._near = None  # built on the first call of candidates
+        self._window_count = None  # the threat map, built on the first query
+        self._line_shapes = None  # open threes and fours of each line, built on the first count
+        # empty locations first, a stone placed is swapped to just past them
+        self._empties = np.argsort(self._stones != Board.STONE_EMPTY, kind='mergesort').tolist()
+        self._empty_pos = np.argsort(self._empties).tolist()
+
+    def _place(self, loc, who):
+        self._stones[loc] = who
+        self.last_loc = loc
+        self.counts[Board.STONE_EMPTY] -= 1
+        self.counts[who] += 1
+        self._swap_empty(loc, self.counts[Board.STONE_EMPTY])
+        self._xor_hashes(who, loc)
+        if self._near is not None:
+            self._near[Board.neighbours()[loc]] += 1
+        if self._window_count is not None:
+            self._threats_place(loc, who)
+
+    def _remove(self, loc):
+        who = self._stones[loc]
+        self._stones[loc] = Board.STONE_EMPTY
+        self._swap_empty(loc, self.counts[Board.STONE_EMPTY])
+        self.counts[Board.STONE_EMPTY] += 1
+        self.counts[who] -= 1
+        self._xor_hashes(who, loc)
+        if self._near is not None:
+            self._near[Board.neighbours()[loc]] -= 1
+        if self._window_count is not None:
+            self._threats_remove(loc, who)
+
+    def _swap_empty(self, loc, i):
+        '''move loc to index i of the empty list'''
+        empties, pos = self._empties, self._empty_pos
+        j = pos[loc]
+        other = empties[i]
+        empties[i], empties[j] = loc, other
+        pos[loc], pos[other] = i, j
+
+    def num_empty(self):
+        return self.counts[Board.STONE_EMPTY]
+
+    def empties(self):
+        '''
+        Returns:
+        ------------
+        locs : 1d array
+            all empty locations, in no particular order
+        '''
+        return np.array(self._empties[:self.counts[Board.STONE_EMPTY]])
+
+    def random_empty(self):
+        '''
+        Returns:
+        ------------
+        loc : int
+            an empty location chosen uniformly, None if the board is full
+        '''
+        n = self.counts[Board.STONE_EMPTY]
+        if n == 0:
+            return None
+        return self._empties[np.random.randint(n)]
+
+    def _xor_hashes(self, who, loc):
+        hashes, keys = self._hashes, Board._symmetry_keys()[who]
+        for t in range(8):
+            hashes[t] ^= keys[t][loc]
+
+    @property
+    def hash(self):
+        '''64-bit zobrist hash of the position'''
+        return self._hashes[0]
+
+    @property
+    def canonical_hash(self):
+        '''the smallest hash among the 8 rotations and reflections of the position'''
+        return min(self._hashes)
+
+    def canonical(self):
+        '''
+        Returns:
+        ------------
+        stones : 1d array
+            the position in canonical orientation
+        hash : int
+            canonical_hash
+        t : int
+            the transform from this board to the canonical one
+        '''
+        hashes = self._hashes
+        t = hashes.index(min(hashes))
+        return self._stones[Board.symmetries()[0][t]], hashes[t], t
+
+    @staticmethod
+    def to_canonical(loc, t):
+        '''map a location to where it is after transform t'''
+        return Board.symmetries()[1][t][loc]
+
+    @staticmethod
+    def from_canonical(loc, t):
+        '''map a location after transform t back to where it was'''
+        return Board.symmetries()[0][t][loc]
+
+    @staticmethod
+    def canonical_batch(stones):
+        '''
+        Parameters
+        ------------
+        stones : 2d array
+            boards of shape (N, BOARD_SIZE_SQ)
+
+        Returns:
+        ------------
+        stones : 2d array
+            every board in canonical orientation
+        hashes : 1d array
+            canonical hash of every board
+        t : 1d array
+            the transform index of every board
+        '''
+        perms, _ = Board.symmetries()
+        stones = np.asarray(stones)
+        variants = stones[:, perms]  # N x 8 x BOARD_SIZE_SQ
+        hashes = Board.hash_batch(variants)
+        t = np.argmin(hashes, axis=1)
+        rows = np.arange(stones.shape[0])
+        return variants[rows, t], hashes[rows, t], t
+
+    @staticmethod
+    def symmetries():
+        '''
+        Returns:
+        ------------
+        perms : 2d array
+            shape (8, BOARD_SIZE_SQ), a board under transform t is stones[perms[t]]
+        inverses : 2d array
+            the inverse permutations, the stone at loc moves to inverses[t][loc]
+        '''
+        def build():
+            grid = np.arange(Board.BOARD_SIZE_SQ).reshape(Board.BOARD_SIZE, Board.BOARD_SIZE)
+            perms = []
+            for k in range(4):
+                rotated = np.rot90(grid, k)
+                perms.append(rotated.ravel())
+                perms.append(np.fliplr(rotated).ravel())
+            perms = np.array(perms)
+            inverses = np.argsort(perms, axis=1)
+            return perms, inverses
+        return Board._cached('symmetries', build)
+
+    @staticmethod
+    def _symmetry_keys():
+        '''zobrist keys as python ints indexed by [who][t][loc], for the hash of each transform'''
+        def build():
+            keys, _ = Board.zobrist()
+            _, inverses = Board.symmetries()
+            return keys[:, inverses].tolist()
+        return Board._cached('symmetry_keys', build)
+
+    @staticmethod
+    def hash_batch(stones):
+        '''
+        Parameters
+        ------------
+        stones : array
+            one board of shape (BOARD_SIZE_SQ,) or many of shape (N, BOARD_SIZE_SQ)
+
+        Returns:
+        ------------
+        hash : uint64 or 1d array of uint64
+            zobrist hash of each board
+        '''
+        keys, _ = Board.zobrist()
+        stones = np.asarray(stones).astype(int)
+        return np.bitwise_xor.reduce(keys[stones, np.arange(stones.shape[-1])], axis=-1)
+
+    @staticmethod
+    def zobrist():
+        '''
+        Returns:
+        ------------
+        keys : 2d array
+            random 64-bit keys of shape (3, BOARD_SIZE_SQ), keys[STONE_EMPTY] are zero
+        keys_list : list(list(int))
+            the same keys as python ints, which are faster for scalar xor
+        '''
+        def build():
+            rng = np.random.RandomState(Board.ZOBRIST_SEED)
+            n = Board.BOARD_SIZE_SQ
+            keys = np.frombuffer(rng.bytes(8 * 3 * n), dtype=np.uint64).reshape(3, n).copy()
+            keys[Board.STONE_EMPTY] = 0
+            return keys, keys.tolist()
+        return Board._cached('zobrist', build)
+
+    @staticmethod
+    def _cached(name, build):
+        '''tables that depend only on the board size are built once for each size'''
+        key = (name, Board.BOARD_SIZE)
+        table = Board._tables.get(key)
+        if table is None:
+            table = Board._tables[key] = build()
+        return table
+
+    def copy(self):
+        b = copy.copy(self)
+        b._stones = self._stones.copy()
+        b.counts = list(self.counts)
+        b.history = list(self.history)
+        b._empties = list(self._empties)
+        b._empty_pos = list(self._empty_pos)
+        b._hashes = list(self._hashes)
+        if self._near is not None:
+            b._near = self._near.copy()
+        if self._window_count is not None:
+            b._window_count = self._window_count.copy()
+            b._hot = [dict(h) for h in self._hot]
+        if self._line_shapes is not None:
+            b._line_shapes = list(self._line_shapes)
+            b._threes = list(self._threes)
+            b._fours = list(self._fours)
+        b.exploration = False
+        return b
+
+    def child(self, loc, who):
+        '''
+        Returns:
+        ------------
+        board : Board
+            a copy of this board with one more stone of who placed at loc
+        '''
+        b = self.copy()
+        b._place(loc, who)
+        return b
+
+    def push(self, loc, who=None):
+        '''
+        place a stone at loc and remember it, so that it can be taken back by pop
+
+        Parameters
+        ------------
+        loc : int
+            where to place
+        who : int
+            the stone colour, the side to move if None
+
+        Returns:
+        ------------
+        over : bool
+            True if the game is over after this move
+        '''
+        if self._stones[loc] != Board.STONE_EMPTY:
+            raise Exception('cannot move here')
+        if who is None:
+            who = self.whose_turn()
+        self.history.append((loc, self.last_loc, self.over, self.winner))
+        self._place(loc, who)
+        if self._is_five_at(loc, who):
+            self.over, self.winner = True, who
+        elif self._is_full():
+            self.over, self.winner = True, Board.STONE_EMPTY
+        return self.over
+
+    def pop(self):
+        '''
+        take back the last pushed stone
+
+        Returns:
+        ------------
+        loc : int
+            where the stone was
+        '''
+        loc, self.last_loc, self.over, self.winner = self.history.pop()
+        self._remove(loc)
+        return loc
+
+    def candidates(self):
+        '''
+        Returns:
+        ------------
+        locs : 1d array
+            the empty locations within NEAR_RADIUS of some stone, those with more
+            stones around first, then those nearer to the centre; only the
+            centre on an empty board
+        '''
+        if self.move_count == 0:
+            return np.array([Board.BOARD_SIZE_SQ // 2])
+        near = self.near_counts()
+        locs = np.flatnonzero((near > 0) & (self._stones == Board.STONE_EMPTY))
+        order = np.lexsort((Board.centre_distance()[locs], -near[locs]))
+        return locs[order]
+
+    def near_counts(self):
+        '''
+        Returns:
+        ------------
+        near : 1d array
+            the number of stones within NEAR_RADIUS of each location, kept up
+            to date by push and pop, not to be changed by the caller
+        '''
+        if self._near is None:
+            nbrs = Board.neighbours()
+            around = [np.zeros(0, int)] + [nbrs[loc] for loc in np.flatnonzero(self._stones)]
+            self._near = np.bincount(np.concatenate(around), minlength=Board.BOARD_SIZE_SQ)
+        return self._near
+
+    def winning_moves(self, who):
+        '''
+        Returns:
+        ------------
+        locs : list(int)
+            the empty locations where who makes five at once
+        '''
+        self._build_threats()
+        return list(self._hot[who])
+
+    def forced_blocks(self, who):
+        '''
+        Returns:
+        ------------
+        locs : list(int)
+            where who must place to stop the opponent making five next move
+        '''
+        return self.winning_moves(Board.oppo(who))
+
+    def threat_counts(self, who):
+        '''
+        Returns:
+        ------------
+        threes : int
+            the open threes of who, see line_shapes
+        fours : int
+            the fours of who, open or not, see line_shapes
+        '''
+        self._build_threats()
+        self._build_shapes()
+        return self._threes[who], self._fours[who]
+
+    def threat_moves(self, who, n):
+        '''
+        Parameters
+        ------------
+        n : int
+            3 for the moves making a four, 2 for those making a three
+
+        Returns:
+        ------------
+        locs : dict(int, int)
+            the empty locations in windows holding n stones of who and none of
+            the opponent, with the number of such windows through each
+        '''
+        self._build_threats()
+        counts = self._window_count
+        ws = np.flatnonzero((counts[who] == n) & (counts[Board.oppo(who)] == 0))
+        windows, _ = Board.line_windows()
+        cells = windows[ws].ravel()
+        cells = cells[self._stones[cells] == Board.STONE_EMPTY]
+        locs, num = np.unique(cells, return_counts=True)
+        return dict(zip(locs.tolist(), num.tolist()))
+
+    def _build_threats(self):
+        if self._window_count is not None:
+            return
+        windows, _ = Board.line_windows()
+        s = self._stones[windows]
+        self._window_count = np.array([np.sum(s == c, axis=1) for c in range(3)])
+        self._hot = [{}, {}, {}]
+        for who in (Board.STONE_BLACK, Board.STONE_WHITE):
+            own = self._window_count[who]
+            clean = self._window_count[Board.oppo(who)] == 0
+            for w in np.flatnonzero(clean & (own == 4)):
+                self._heat(who, self._empty_in(w), 1)
+
+    def _build_shapes(self):
+        if self._line_shapes is not None:
+            return
+        lines, _ = Board.lines()
+        self._line_shapes = [Board.line_shapes(self._stones[line]) for line in lines]
+        self._threes = [sum(shape[0][c] for shape in self._line_shapes) for c in range(3)]
+        self._fours = [sum(shape[1][c] for shape in self._line_shapes) for c in range(3)]
+
+    def _update_shapes(self, loc):
+        '''classify again the lines through loc, after the stone there changed'''
+        lines, cell_lines = Board.lines()
+        for l in cell_lines[loc]:
+            (old3, old4), (new3, new4) = self._line_shapes[l], Board.line_shapes(self._stones[lines[l]])
+            self._line_shapes[l] = new3, new4
+            for c in (Board.STONE_BLACK, Board.STONE_WHITE):
+                self._threes[c] += new3[c] - old3[c]
+                self._fours[c] += new4[c] - old4[c]
+
+    def _threats_place(self, loc, who):
+        '''update the threat map along the windows through loc, after who placed there'''
+        _, cell_windows = Board.line_windows()
+        ws = cell_windows[loc]
+        oppo = Board.oppo(who)
+        counts = self._window_count
+        own, other = counts[who, ws], counts[oppo, ws]
+        counts[who, ws] += 1
+        counts[Board.STONE_EMPTY, ws] -= 1
+
+        clean = other == 0
+        for w in ws[clean & (own == 3)]:
+            self._heat(who, self._empty_in(w), 1)
+        self._heat(who, loc, -np.count_nonzero(clean & (own == 4)))
+
+        # windows that were open to the opponent are blocked now
+        self._heat(oppo, loc, -np.count_nonzero((own == 0) & (other == 4)))
+        if self._line_shapes is not None:
+            self._update_shapes(loc)
+
+    def _threats_remove(self, loc, who):
+        '''update the threat map along the windows through loc, after the stone of who there is removed'''
+        _, cell_windows = Board.line_windows()
+        ws = cell_windows[loc]
+        oppo = Board.oppo(who)
+        counts = self._window_count
+        own, other = counts[who, ws], counts[oppo, ws]
+        counts[who, ws] -= 1
+        counts[Board.STONE_EMPTY, ws] += 1
+
+        clean = other == 0
+        for w in ws[clean & (own == 4)]:
+            self._heat(who, self._empty_in(w, loc), -1)
+        self._heat(who, loc, np.count_nonzero(clean & (own == 5)))
+
+        # windows blocked only by this stone are open to the opponent again
+        self._heat(oppo, loc, np.count_nonzero((own == 1) & (other == 4)))
+        if self._line_shapes is not None:
+            self._update_shapes(loc)
+
+    def _heat(self, who, loc, n):
+        '''count n more windows where who makes five by placing at loc'''
+        if n == 0:
+            return
+        hot = self._hot[who]
+        n += hot.get(loc, 0)
+        if n:
+            hot[loc] = n
+        else:
+            del hot[loc]
+
+    def _empty_in(self, w, besides=None):
+        '''the empty cell of window w, other than besides'''
+        windows, _ = Board.line_windows()
+        for loc in windows[w]:
+            if self._stones[loc] == Board.STONE_EMPTY and loc != besides:
+                return int(loc)
+
+    @staticmethod
+    def neighbours():
+        '''
+        Returns:
+        ------------
+        nbrs : list(1d array)
+            for each location, the other locations within NEAR_RADIUS of it
+        '''
+        def build():
+            size, r = Board.BOARD_SIZE, Board.NEAR_RADIUS
+            nbrs = []
+            for row in range(size):
+                for col in range(size):
+                    rows, cols = np.mgrid[max(0, row - r):min(size, row + r + 1),
+                                          max(0, col - r):min(size, col + r + 1)]
+                    locs = (rows * size + cols).ravel()
+                    nbrs.append(locs[locs != row * size + col])
+            return nbrs
+        return Board._cached('neighbours', build)
+
+    @staticmethod
+    def centre_distance():
+        '''
+        Returns:
+        ------------
+        dist : 1d array
+            the chessboard distance from each location to the centre
+        '''
+        def build():
+            half = Board.BOARD_SIZE // 2
+            rows, cols = np.divmod(np.arange(Board.BOARD_SIZE_SQ), Board.BOARD_SIZE)
+            return np.maximum(np.abs(rows - half), np.abs(cols - half))
+        return Board._cached('centre_distance', build)
+
+    @property
+    def move_count(self):
+        return self.counts[Board.STONE_BLACK] + self.counts[Board.STONE_WHITE]
+
+    def whose_turn(self):
+        '''
+        Returns:
+        -------------
+        who: int
+            the side to move, STONE_EMPTY if the board is full
+        '''
+        counts = self.counts
+        if counts[Board.STONE_EMPTY] == 0:
+            return Board.STONE_EMPTY  # end
+        if counts[Board.STONE_BLACK] == counts[Board.STONE_WHITE]:
+            return Board.STONE_BLACK  # black first, turn to black
+        if counts[Board.STONE_BLACK] == counts[Board.STONE_WHITE] + 1:
+            return Board.STONE_WHITE  # turn to while
+        raise Exception("illegal state")
 
     @staticmethod
     def rand_generate_a_position():
@@ -46,6 +569,7 @@ class Board(object):
 
             m2 = m.reshape(-1, Board.BOARD_SIZE)
             if not Board.find_conn_5_all(m2):
+                b.stones = m
                 return b
 
     @staticmethod
@@ -60,7 +584,7 @@ class Board(object):
         index = np.ravel_multi_index((x, y), (Board.BOARD_SIZE, Board.BOARD_SIZE))
         if index >= Board.BOARD_SIZE_SQ or self.stones[index] != Board.STONE_EMPTY:
             raise Exception('cannot move here')
-        self.stones[index] = v
+        self.push(index, v)
 
     def get(self, x, y):
         return self.stones[x * Board.BOARD_SIZE + y]
@@ -151,52 +675,130 @@ class Board(object):
 
     @staticmethod
     def find_pattern_will_win(board, who):
-        pats = np.identity(Board.WIN_STONE_NUM, int)
-        pats = 1 - pats
-        pats[pats == 1] = who
+        '''True if who can get five in a row with one more stone'''
+        windows, _ = Board.line_windows()
+        s = board.stones[windows]
+        return bool(np.any((np.sum(s == who, axis=1) == Board.WIN_STONE_NUM - 1) &
+                           np.any(s == Board.STONE_EMPTY, axis=1)))
 
-        board = board.stones.reshape(-1, Board.BOARD_SIZE)
+    @staticmethod
+    def find_conn_5_all(board):
+        windows, _ = Board.line_windows()
+        s = np.ravel(board)[windows]
+        return bool(np.any(np.all(s == s[:, :1], axis=1) & (s[:, 0] != Board.STONE_EMPTY)))
 
-        lines = []
-        for i in range(Board.BOARD_SIZE):
-            lines.append(Board._row(board, i, 0))
-            lines.append(Board._col(board, 0, i))
-            lines.append(Board._diag(board, i, 0))
-            lines.append(Board._diag(board, 0, i))
-            lines.append(Board._diag_counter(board, i, Board.BOARD_SIZE - 1))
-            lines.append(Board._diag_counter(board, 0, i))
+    @staticmethod
+    def lines():
+        '''
+        Returns:
+        ------------
+        lines : list(1d array)
+            the locations along every row, column, diagonal and counter diagonal
+            of at least WIN_STONE_NUM cells
+        cell_lines : list(list(int))
+            for each location, the indexes of the lines through it
+        '''
+        def build():
+            size = Board.BOARD_SIZE
+            grid = np.arange(Board.BOARD_SIZE_SQ).reshape(size, size)
+            lines = []
+            for direction in (grid, grid.T,
+                              [np.diag(grid, d) for d in range(-size + 1, size)],
+                              [np.diag(np.fliplr(grid), d) for d in range(-size + 1, size)]):
+                lines.extend(line for line in direction if len(line) >= Board.WIN_STONE_NUM)
+            cell_lines = [[] for _ in range(Board.BOARD_SIZE_SQ)]
+            for l, line in enumerate(lines):
+                for loc in line:
+                    cell_lines[loc].append(l)
+            return lines, cell_lines
+        return Board._cached('lines', build)
 
-        for v in lines:
-            if v.size < Board.WIN_STONE_NUM:
-                continue
-            for p in pats:
-                occur = Board._find_subseq(v, p)
-                if occur.size != 0:
-                    return True
+    @staticmethod
+    def line_shapes(line):
+        '''
+        A four is a group of stones that one more stone turns into five, the
+        windows that share their stones or their empty cell being one four, so
+        .XXXX. is counted once. An open three is three stones that one more
+        stone turns into a straight four, four in a row with both ends empty,
+        so ..XXX.. and .X.XX. are open threes but OXXX.. and .XXX.O are not.
+        A three inside a four is not counted again.
+
+        Parameters
+        ------------
+        line : 1d array
+            the stones along a line
 
-        return False
+        Returns:
+        ------------
+        threes : tuple(int)
+            the open threes in the line, indexed by stone colour
+        fours : tuple(int)
+            the fours in the line, indexed by stone colour
+        '''
+        key = line.tobytes()
+        shapes = Board._shape_memo.get(key)
+        if shapes is not None:
+            return shapes
+
+        cells, k = line.tolist(), Board.WIN_STONE_NUM
+        threes, fours = [0, 0, 0], [0, 0, 0]
+        for who in (Board.STONE_BLACK, Board.STONE_WHITE):
+            groups = []  # (stones, empty cells) of each four
+            for i in range(len(cells) - k + 1):
+                w = cells[i:i + k]
+                if w.count(who) != k - 1 or w.count(Board.STONE_EMPTY) != 1:
+                    continue
+                stones = frozenset(j for j in range(i, i + k) if cells[j] == who)
+                empty = i + w.index(Board.STONE_EMPTY)
+                joined = [g for g in groups if stones in g[0] or empty in g[1]]
+                merged = ({stones}, {empty})
+                for g in joined:
+                    groups.remove(g)
+                    merged[0].update(g[0])
+                    merged[1].update(g[1])
+                groups.append(merged)
+            in_four = [stones for g in groups for stones in g[0]]
+
+            three_sets = set()
+            for i in range(len(cells) - k):
+                inner = cells[i + 1:i + k]
+                if cells[i] != Board.STONE_EMPTY or cells[i + k] != Board.STONE_EMPTY or \
+                        inner.count(who) != k - 2 or inner.count(Board.STONE_EMPTY) != 1:
+                    continue
+                stones = frozenset(j for j in range(i + 1, i + k) if cells[j] == who)
+                if not any(stones < f for f in in_four):
+                    three_sets.add(stones)
+            threes[who], fours[who] = len(three_sets), len(groups)
+
+        if len(Board._shape_memo) >= Board.SHAPE_MEMO_LIMIT:
+            Board._shape_memo.clear()
+        shapes = Board._shape_memo[key] = tuple(threes), tuple(fours)
+        return shapes
 
     @staticmethod
-    def find_conn_5_all(board):
-        lines = []
-        for i in range(Board.BOARD_SIZE):
-            lines.append(Board._row(board, i, 0))
-            lines.append(Board._col(board, 0, i))
-            lines.append(Board._diag(board, i, 0))
-            lines.append(Board._diag(board, 0, i))
-            lines.append(Board._diag_counter(board, i, Board.BOARD_SIZE - 1))
-            lines.append(Board._diag_counter(board, 0, i))
-        for v in lines:
-            if v.size < Board.WIN_STONE_NUM:
-                continue
-            occur = Board._find_subseq(v, Board.WIN_PATTERN[Board.STONE_BLACK])
-            if occur.size != 0:
-                return True
-            occur = Board._find_subseq(v, Board.WIN_PATTERN[Board.STONE_WHITE])
-            if occur.size != 0:
-                return True
-
-        return False
+    def line_windows():
+        '''
+        Returns:
+        ------------
+        windows : 2d array
+            shape (num_windows, WIN_STONE_NUM), the locations of every run of
+            WIN_STONE_NUM cells along a row, column, diagonal or counter diagonal
+        cell_windows : list(1d array)
+            for each location, the indexes of the windows covering it
+        '''
+        def build():
+            k = Board.WIN_STONE_NUM
+            windows = []
+            for line in Board.lines()[0]:
+                for i in range(len(line) - k + 1):
+                    windows.append(line[i:i + k])
+            windows = np.array(windows, dtype=int).reshape(-1, k)
+            owner = np.repeat(np.arange(windows.shape[0]), k)
+            order = np.argsort(windows.ravel(), kind='mergesort')
+            bounds = np.searchsorted(windows.ravel()[order], np.arange(Board.BOARD_SIZE_SQ + 1))
+            cell_windows = [owner[order[bounds[i]:bounds[i + 1]]] for i in range(Board.BOARD_SIZE_SQ)]
+            return windows, cell_windows
+        return Board._cached('line_windows', build)
 
     def is_over(self, old_board):
         '''
@@ -219,34 +821,47 @@ class Board(object):
 #         print(self.stones.reshape(-1, Board.BOARD_SIZE))
         if old_board is None:  # at the beginning
             return False, None, None
-        diff = np.where((old_board.stones != self.stones))[0]
-        if diff.size == 0:
-            raise Exception('same state')
-        if diff.size > 1:
-            raise Exception('too many steps')
 
-        loc = diff[0]
-        if old_board.stones[loc] != 0:
-            raise Exception('must be set at empty place')
+        loc = self._changed_loc(old_board)
         who = self.stones[loc]
-        grid = self.stones.reshape(-1, Board.BOARD_SIZE)
-        row, col = divmod(loc, Board.BOARD_SIZE)
 
-#         print('who[%d] at [%d, %d]' % (who, row, col))
-#         print(grid)
-
-        win = self.find_conn_5(grid, row, col, who)
-        if win:
+        if self._is_five_at(loc, who):
             self.over = True
             self.winner = who
             return True, who, loc
 
-        if np.where(self.stones == 0)[0].size == 0:  # the last step
+        if self._is_full():  # the last step
             self.over = True
             return True, Board.STONE_EMPTY, loc
 
         return False, None, loc
 
+    def _changed_loc(self, old_board):
+        diff = np.where((old_board.stones != self.stones))[0]
+        if diff.size == 0:
+            raise Exception('same state')
+        if diff.size > 1:
+            raise Exception('too many steps')
+
+        loc = diff[0]
+        if old_board.stones[loc] != 0:
+            raise Exception('must be set at empty place')
+        return loc
+
+    def _is_five_at(self, loc, who):
+        return bool((self._stones[Board._window_cells()[loc]] == who).all(axis=1).any())
+
+    @staticmethod
+    def _window_cells():
+        '''for each location, the cells of the windows covering it, one window per row'''
+        def build():
+            windows, cell_windows = Board.line_windows()
+            return [windows[ws] for ws in cell_windows]
+        return Board._cached('window_cells', build)
+
+    def _is_full(self):
+        return self.counts[Board.STONE_EMPTY] == 0
+
     def __str__(self):
 #         grid = self.stones.reshape(-1, Board.BOARD_SIZE)
         return str(self.stones)
@@ -0,0 +1,158 @@
+import numpy as np
+from tentacle.board import Board
+
+
+class BoardBatch(object):
+    '''
+    many games played side by side, every method works on all of them at once
+
+    Attributes:
+    ------------------
+    stones : 2d array
+        shape (N, BOARD_SIZE_SQ), the board of every game
+    turn : 1d array
+        the side to move of every game
+    move_count : 1d array
+        stones placed in every game
+    done : 1d array
+        True if the game is over
+    winner : 1d array
+        the winner of every finished game, STONE_EMPTY for a draw
+    '''
+
+    _tables = {}
+
+    def __init__(self, n):
+        self.stones = np.zeros((n, Board.BOARD_SIZE_SQ), np.int8)
+        self.turn = np.full(n, Board.STONE_BLACK, np.int8)
+        self.move_count = np.zeros(n, int)
+        self.done = np.zeros(n, bool)
+        self.winner = np.zeros(n, np.int8)
+
+    @staticmethod
+    def from_boards(boards):
+        batch = BoardBatch(len(boards))
+        for i, b in enumerate(boards):
+            batch.stones[i] = b.stones
+        batch._sync(np.ones(len(boards), bool))
+        return batch
+
+    def set_board(self, i, board):
+        '''replace game i by the position of board'''
+        self.stones[i] = board.stones
+        self._sync(np.arange(len(self)) == i)
+
+    def to_board(self, i, board_cls=Board):
+        b = board_cls()
+        b.stones = self.stones[i].astype(int)
+        return b
+
+    def __len__(self):
+        return self.stones.shape[0]
+
+    def legal_mask(self):
+        '''
+        Returns:
+        ------------
+        mask : 2d array
+            True where the side to move may place, all False for finished games
+        '''
+        return (self.stones == Board.STONE_EMPTY) & ~self.done[:, np.newaxis]
+
+    def play(self, locs):
+        '''
+        place a stone for the side to move in every unfinished game
+
+        Parameters
+        ------------
+        locs : 1d array
+            one location per game, ignored for finished games
+
+        Returns:
+        ------------
+        ended : 1d array
+            True for games that ended with this move
+        '''
+        live = np.flatnonzero(~self.done)
+        locs = np.asarray(locs)[live]
+        who = self.turn[live]
+        if np.any(self.stones[live, locs] != Board.STONE_EMPTY):
+            raise Exception('cannot move here')
+        self.stones[live, locs] = who
+        self.move_count[live] += 1
+
+        win = self._is_five_at(live, locs, who)
+        full = self.move_count[live] == Board.BOARD_SIZE_SQ
+        ended = np.zeros(len(self), bool)
+        ended[live] = win | full
+        self.winner[live[win]] = who[win]
+        self.done |= ended
+        self.turn[live] = Board.STONE_BLACK + Board.STONE_WHITE - who
+        return ended
+
+    def winners(self):
+        '''
+        Returns:
+        ------------
+        winner : 1d array
+            the winner of every game, STONE_EMPTY for a draw or a game going on
+        '''
+        return np.where(self.done, self.winner, Board.STONE_EMPTY)
+
+    def reset(self, done=None):
+        '''
+        clear the games selected by the mask done, all games if None
+        '''
+        games = np.ones(len(self), bool) if done is None else np.asarray(done, bool)
+        self.stones[games] = Board.STONE_EMPTY
+        self.turn[games] = Board.STONE_BLACK
+        self.move_count[games] = 0
+        self.done[games] = False
+        self.winner[games] = Board.STONE_EMPTY
+
+    def _sync(self, games):
+        '''recompute turn, move count and result of the selected games from stones'''
+        stones = self.stones[games]
+        black = np.sum(stones == Board.STONE_BLACK, axis=1)
+        white = np.sum(stones == Board.STONE_WHITE, axis=1)
+        self.move_count[games] = black + white
+        self.turn[games] = np.where(black == white, Board.STONE_BLACK, Board.STONE_WHITE)
+
+        windows, _ = Board.line_windows()
+        s = stones[:, windows]
+        five = np.all(s == s[:, :, :1], axis=2) & (s[:, :, 0] != Board.STONE_EMPTY)
+        has_five = np.any(five, axis=1)
+        first = np.argmax(five, axis=1)
+        winner = np.where(has_five, s[np.arange(s.shape[0]), first, 0], Board.STONE_EMPTY)
+        self.winner[games] = winner
+        self.done[games] = has_five | (self.move_count[games] == Board.BOARD_SIZE_SQ)
+
+    def _is_five_at(self, games, locs, who):
+        windows, cell_windows = BoardBatch._table()
+        covering = cell_windows[locs]  # M x 20, -1 for padding
+        s = self.stones[games[:, np.newaxis, np.newaxis], windows[covering]]
+        five = np.all(s == who[:, np.newaxis, np.newaxis], axis=2) & (covering >= 0)
+        return np.any(five, axis=1)
+
+    @staticmethod
+    def _table():
+        '''
+        Returns:
+        ------------
+        windows : 2d array
+            Board.line_windows()
+        cell_windows : 2d array
+            shape (BOARD_SIZE_SQ, 20), the windows covering each cell, padded with -1
+        '''
+        size = Board.BOARD_SIZE
+        table = BoardBatch._tables.get(size)
+        if table is not None:
+            return table
+
+        windows, cell_windows = Board.line_windows()
+        padded = np.full((Board.BOARD_SIZE_SQ, max(len(c) for c in cell_windows)), -1)
+        for loc, c in enumerate(cell_windows):
+            padded[loc, :len(c)] = c
+        table = (windows, padded)
+        BoardBatch._tables[size] = table
+        return table
@@ -1,15 +1,33 @@
+import multiprocessing
+import os
+import time
+import numpy as np
 from tentacle.board import Board
 
-class Eval(object):
-    SZ = Board.BOARD_SIZE
-    HS = SZ // 2
 
-    def __init__(self):
-        self.POS = []
-        for i in range(Eval.SZ):
-            row = [ (Eval.HS - max(abs(i - Eval.HS), abs(j - Eval.HS))) for j in range(Eval.SZ) ]
-            self.POS.append(tuple(row))
-        self.POS = tuple(self.POS)
+class BoardSized(type):
+    '''SZ and HS of the class read the current Board size, so they follow Board.set_board_size'''
+
+    @property
+    def SZ(cls):
+        return Board.BOARD_SIZE
+
+    @property
+    def HS(cls):
+        return Board.BOARD_SIZE // 2
+
+
+class Eval(object, metaclass=BoardSized):
+    REACH = 6  # 查表窗口：棋子左右各 REACH 格
+    POW = tuple(3 ** k for k in range(32))
+    TABLE_NAME = 'dfs_line_table.npy'
+    MEMO_LIMIT = 1 << 20
+    _table = None  # 窗口编码 -> 窗口内各格的分析结果，所有 Eval 共用
+    _memo = {}  # (是否右斜线, 线长, 线编码) -> 线上各棋型的 (颜色, 棋型)
+
+    # table_file：窗口表存盘的路径，None 时用 table_path()
+    def __init__(self, table_file=None):
+        self.table_file = table_file or Eval.table_path()
         self.STWO = 1  # 冲二
         self.STHREE = 2  # 冲三
         self.SFOUR = 3  # 冲四
@@ -21,21 +39,191 @@ class Eval(object):
         self.FOURT = 9  # 四三
         self.DTHREE = 10  # 双三
         self.NOTYPE = 11
+        self.CHECK = (self.FIVE, self.FOUR, self.SFOUR, self.THREE, self.STHREE, self.TWO, self.STWO)  # 计数的棋型
         self.ANALYSED = 255  # 已经分析过
         self.TODO = 0  # 没有分析过
         self.result = [ 0 for i in range(30) ]  # 保存当前直线分析值
         self.line = [ 0 for i in range(30) ]  # 当前直线数据
+        self.count = []  # 每种棋局的个数：count[黑棋/白棋][模式]
+        for i in range(3):
+            data = [ 0 for i in range(20) ]
+            self.count.append(data)
+        self.__init_board()
+        self.tracking = False  # 是否在随落子增量更新分析结果
+        self.reset()
+
+    # 按当前棋盘大小建位置权值，全盘分析结果和所有直线
+    def __init_board(self):
+        self.size = Eval.SZ
+        self.POS = []
+        for i in range(Eval.SZ):
+            row = [ (Eval.HS - max(abs(i - Eval.HS), abs(j - Eval.HS))) for j in range(Eval.SZ) ]
+            self.POS.append(tuple(row))
+        self.POS = tuple(self.POS)
+        self.POS_AT = tuple(p for row in self.POS for p in row)  # 按位置 i * SZ + j 排的权值
         self.record = []  # 全盘分析结果 [row][col][方向]
         for i in range(Eval.SZ):
             self.record.append([])
             self.record[i] = []
             for j in range(Eval.SZ):
                 self.record[i].append([ 0, 0, 0, 0])
-        self.count = []  # 每种棋局的个数：count[黑棋/白棋][模式]
-        for i in range(3):
-            data = [ 0 for i in range(20) ]
-            self.count.append(data)
+        self.__init_lines()
+
+    # 全盘所有直线(横，竖，左斜，右斜)，每条线是按分析顺序排列的位置 i * SZ + j
+    def __init_lines(self):
+        SZ = Eval.SZ
+        self.lines = []
+        for i in range(SZ):
+            self.lines.append((0, [ (i, x) for x in range(SZ) ]))
+        for j in range(SZ):
+            self.lines.append((1, [ (x, j) for x in range(SZ) ]))
+        for x, y in [ (x, 0) for x in range(SZ - 1, 0, -1) ] + [ (0, y) for y in range(SZ) ]:
+            self.lines.append((2, [ (y + k, x + k) for k in range(SZ - max(x, y)) ]))
+        for x, y in [ (0, y) for y in range(SZ) ] + [ (x, SZ - 1) for x in range(1, SZ) ]:
+            self.lines.append((3, [ (y - k, x + k) for k in range(min(y + 1, SZ - x)) ]))
+        self.lines = [ (d, [ i * SZ + j for i, j in cells ]) for d, cells in self.lines ]
+        # 每个格子所在的四条线，以及它在线编码中的权值 3^k
+        self.cell_lines = [ [ None ] * 4 for loc in range(SZ * SZ) ]
+        for n, (d, locs) in enumerate(self.lines):
+            for k, loc in enumerate(locs):
+                self.cell_lines[loc][d] = (n, Eval.POW[k])
+        self.line_code = [ 0 for n in self.lines ]  # 每条线的三进制编码，第 k 位是第 k 格
+        self.line_count = [ () for n in self.lines ]  # 每条线上各棋型的 (颜色, 棋型)
+        self.totals = [ [ 0 for i in range(20) ] for c in range(3) ]  # 全部直线的棋型个数之和
+        self.pos_sum = [ 0, 0, 0 ]  # 黑白棋子的位置权值之和
+        self.stack = []
+
+    # 从头分析 Board 上所有直线，之后 make/unmake 只更新经过落子的四条线
+    def sync(self, board):
+        if self.size != Eval.SZ:
+            self.__init_board()
         self.reset()
+        self.totals = [ [ 0 for i in range(20) ] for c in range(3) ]
+        self.pos_sum = [ 0, 0, 0 ]
+        self.stack = []
+        POW = Eval.POW
+        stones = board.stones.tolist()
+        for n, (d, locs) in enumerate(self.lines):
+            self.line_code[n] = sum(stones[loc] * POW[k] for k, loc in enumerate(locs))
+            self.line_count[n] = ()
+            self.__analysis_line_at(n)
+        for loc, stone in enumerate(stones):
+            self.pos_sum[stone] += self.POS_AT[loc]
+        self.tracking = True
+
+    # 刚在 loc 落下 stone：保存经过它的四条线的编码和棋型后重新分析
+    def make(self, loc, stone):
+        code = self.line_code
+        for n, w in self.cell_lines[loc]:
+            self.stack.append((n, code[n], self.line_count[n]))
+            code[n] += stone * w
+            self.__analysis_line_at(n)
+        self.stack.append((loc, stone))
+        self.pos_sum[stone] += self.POS_AT[loc]
+
+    # 悔棋：恢复 make 之前的四条线
+    def unmake(self):
+        loc, stone = self.stack.pop()
+        self.pos_sum[stone] -= self.POS_AT[loc]
+        totals = self.totals
+        for _ in range(4):
+            n, code, pairs = self.stack.pop()
+            self.line_code[n] = code
+            for c, ch in self.line_count[n]:
+                totals[c][ch] -= 1
+            for c, ch in pairs:
+                totals[c][ch] += 1
+            self.line_count[n] = pairs
+
+    # 按编码查第 n 条线的棋型，同样的线只分析一次
+    def __analysis_line_at(self, n):
+        d, locs = self.lines[n]
+        key = (d == 3, len(locs), self.line_code[n])
+        pairs = Eval._memo.get(key)
+        if pairs is None:
+            if len(Eval._memo) >= Eval.MEMO_LIMIT:
+                Eval._memo.clear()
+            pairs = Eval._memo[key] = self.__classify(*key)
+
+        totals = self.totals
+        for c, ch in self.line_count[n]:
+            totals[c][ch] -= 1
+        for c, ch in pairs:
+            totals[c][ch] += 1
+        self.line_count[n] = pairs
+
+    # 按全盘分析时的顺序(逐行扫描)依次分析线上每个未分析过的棋子，每个棋子查一次窗口表
+    def __classify(self, rev, num, code):
+        table = self.__line_table()
+        POW, R, TODO, FIVE = Eval.POW, Eval.REACH, self.TODO, self.FIVE
+        W = 2 * R + 1
+        SIDES = (POW[R + 1] - 1) // 2  # 长度 0..R 的一侧共有多少种
+        line = [ code // POW[k] % 3 for k in range(num) ]
+        swapped = 3 * sum(POW[k] for k in range(num) if line[k]) - code  # 黑白互换后的编码
+        rec = [ TODO for k in range(num) ]
+        order = range(num - 1, -1, -1) if rev else range(num)  # 右斜线上行号随 k 减小
+        for k in order:
+            if line[k] == 0 or rec[k] != TODO:
+                continue
+            c = code if line[k] == 1 else swapped  # 窗口表里中心总是黑子
+            ml, mr = min(k, R), min(num - 1 - k, R)
+            left = c // POW[k - ml] % POW[ml] + (POW[ml] - 1) // 2
+            right = c // POW[k + 1] % POW[mr] + (POW[mr] - 1) // 2
+            row = table[(left * SIDES + right) * W:(left * SIDES + right + 1) * W]
+            if row[R] == FIVE:  # 连五可能超出窗口，整条线重新分析
+                result = self.result
+                self.analysis_line(line[:], result, num, k)
+                row, base, lo, hi = result, 0, 0, num
+            else:
+                base, lo, hi = R - k, max(0, k - R), min(num, k + R + 1)
+            for s in range(lo, hi):
+                if row[base + s] != TODO:
+                    rec[s] = row[base + s]
+
+        CHECK = self.CHECK
+        return tuple((line[k], rec[k]) for k in range(num) if line[k] != 0 and rec[k] in CHECK)
+
+    # 窗口表默认存在 TENTACLE_CACHE 目录，没有设置时存在用户缓存目录，不写进安装目录
+    @staticmethod
+    def table_path():
+        cache = os.environ.get('TENTACLE_CACHE')
+        if not cache:
+            home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            cache = os.path.join(home, 'tentacle')
+        return os.path.join(cache, Eval.TABLE_NAME)
+
+    # 窗口表：一侧是棋子左边最多 REACH 格，另一侧是右边最多 REACH 格，
+    # 棋盘边界之外的格子不计入窗口，所以表与棋盘大小无关，建好后存盘。
+    # 多个进程可能同时建表，先写临时文件再改名，读到的文件总是完整的
+    def __line_table(self):
+        if Eval._table is not None:
+            return Eval._table
+        R = Eval.REACH
+        W = 2 * R + 1
+        sides = [ [ v // 3 ** i % 3 for i in range(m) ] for m in range(R + 1) for v in range(3 ** m) ]
+        size = len(sides)
+        try:
+            table = np.load(self.table_file)
+        except Exception:  # 没有文件或文件损坏都重建
+            table = None
+        if table is None or table.shape != (size * size, W) or table.dtype != np.uint8:
+            table = np.zeros((size * size, W), np.uint8)
+            result = [ 0 for i in range(30) ]
+            for a, left in enumerate(sides):
+                for b, right in enumerate(sides):
+                    lo, hi = R - len(left), R + 1 + len(right)
+                    self.analysis_line(left + [ 1 ] + right, result, hi - lo, len(left))
+                    table[a * size + b, lo:hi] = result[:hi - lo]
+            tmp = '%s.%d.tmp' % (self.table_file, os.getpid())
+            try:
+                os.makedirs(os.path.dirname(self.table_file), exist_ok=True)
+                with open(tmp, 'wb') as f:
+                    np.save(f, table)
+                os.replace(tmp, self.table_file)
+            except OSError:
+                pass
+        Eval._table = table.tobytes()
+        return Eval._table
 
     # 复位数据
     def reset(self):
@@ -72,39 +260,16 @@ class Eval(object):
 
     # 四个方向（水平，垂直，左斜，右斜）分析评估棋盘，然后根据分析结果打分
     def __evaluate(self, board, turn):
-        record, count = self.record, self.count
-        TODO, ANALYSED = self.TODO, self.ANALYSED
-        self.reset()
-        # 四个方向分析
-        for i in range(Eval.SZ):
-            boardrow = board[i]
-            recordrow = record[i]
-            for j in range(Eval.SZ):
-                if boardrow[j] != 0:
-                    if recordrow[j][0] == TODO:  # 水平没有分析过？
-                        self.__analysis_horizon(board, i, j)
-                    if recordrow[j][1] == TODO:  # 垂直没有分析过？
-                        self.__analysis_vertical(board, i, j)
-                    if recordrow[j][2] == TODO:  # 左斜没有分析过？
-                        self.__analysis_left(board, i, j)
-                    if recordrow[j][3] == TODO:  # 右斜没有分析过
-                        self.__analysis_right(board, i, j)
+        # 不在搜索中时从头分析全盘，搜索中各直线的分析结果随 make/unmake 更新
+        if not self.tracking:
+            self.sync(board)
+            self.tracking = False
 
         FIVE, FOUR, THREE, TWO = self.FIVE, self.FOUR, self.THREE, self.TWO
         SFOUR, STHREE, STWO = self.SFOUR, self.STHREE, self.STWO
-        check = {}
 
         # 分别对白棋黑棋计算：FIVE, FOUR, THREE, TWO等出现的次数
-        for c in (FIVE, FOUR, SFOUR, THREE, STHREE, TWO, STWO):
-            check[c] = 1
-        for i in range(Eval.SZ):
-            for j in range(Eval.SZ):
-                stone = board[i][j]
-                if stone != 0:
-                    for k in range(4):
-                        ch = record[i][j][k]
-                        if ch in check:
-                            count[stone][ch] += 1
+        count = self.count = [ row[:] for row in self.totals ]
 
         # 如果有五连则马上返回分数
         BLACK, WHITE = Board.STONE_BLACK, Board.STONE_WHITE
@@ -195,15 +360,7 @@ class Eval(object):
                 wvalue += count[WHITE][STWO]
 
         # 加上位置权值，棋盘最中心点权值是7，往外一格-1，最外圈是0
-        wc, bc = 0, 0
-        for i in range(Eval.SZ):
-            for j in range(Eval.SZ):
-                stone = board[i][j]
-                if stone != 0:
-                    if stone == WHITE:
-                        wc += self.POS[i][j]
-                    else:
-                        bc += self.POS[i][j]
+        wc, bc = self.pos_sum[WHITE], self.pos_sum[BLACK]
         wvalue += wc
         bvalue += bc
 
@@ -273,7 +430,10 @@ class Eval(object):
         return record[i][j][3]
 
     def test(self, board):
+        if self.size != Eval.SZ:
+            self.__init_board()
         self.reset()
+        board = board.stones.reshape((Eval.SZ, Eval.SZ)).tolist()
         record = self.record
         TODO = self.TODO
         for i in range(Eval.SZ):
@@ -453,30 +613,75 @@ class Eval(object):
 
 
 class Searcher(object):
-
-    def __init__(self):
+    '''
+    alpha-beta search on a Board, moves are tried with push/pop, and the
+    evaluator and the position hash follow them
+    '''
+    EXACT, LOWER, UPPER = 0, 1, 2  # 置换表中分数的类型：准确值，下界，上界
+    ASPIRATION = 100  # 期望窗口半宽
+    CHECK_EVERY = 256  # 每搜索这么多个节点检查一次是否超时
+
+    def __init__(self, tt_size=1 << 18):
         self.evaluator = Eval()
-        self.board = [ [ 0 for n in range(Eval.SZ) ] for i in range(Eval.SZ) ]
+        self.board = Board()
         self.gameover = 0
         self.overvalue = 0
         self.maxdepth = 3
-
-    # 产生当前棋局的走法
+        self.tt = {}  # 置换表：局面哈希 -> (深度, 分数类型, 分数, 最佳走法)
+        self.tt_size = tt_size
+        self.killers = []  # 每层两个引起剪枝的走法
+        self.history = [ 0 for loc in range(Board.BOARD_SIZE_SQ) ]
+        self.deadline = None
+        self.stopped = False
+        self.nodes = 0
+        self.depth_reached = 0
+
+    # 局面哈希：棋子的 zobrist 值再区分轮到谁走和棋盘大小
+    def __key(self, turn):
+        return self.board.hash ^ (0x9e3779b97f4a7c15 if turn == 2 else 0) ^ Board.BOARD_SIZE
+
+    # 落子和悔棋，Board 同时更新周围棋子数和局面哈希
+    def __make(self, loc, turn):
+        self.board.push(loc, turn)
+        self.evaluator.make(loc, turn)
+
+    def __unmake(self):
+        self.board.pop()
+        self.evaluator.unmake()
+
+    # 产生当前棋局的走法：即 Board 的候选点，杀手、置换表和历史的排序由 __order 叠加
     def genmove(self, turn):
-        moves = []
-        board = self.board
-        POSES = self.evaluator.POS
-        for i in range(Eval.SZ):
-            for j in range(Eval.SZ):
-                if board[i][j] == 0:
-                    score = POSES[i][j]
-                    moves.append((score, i, j))
-        moves.sort()
-        moves.reverse()
-        return moves
+        return self.board.candidates().tolist()
+
+    # 记入置换表，表满时整个清空
+    def _store(self, key, entry):
+        if len(self.tt) >= self.tt_size:
+            self.tt.clear()
+        self.tt[key] = entry
+
+    # 走法排序：置换表中的最佳走法，本层的杀手走法，然后按历史分数，同分保持 genmove 的顺序
+    def __order(self, moves, ply, ttmove):
+        history = self.history
+        moves = sorted(moves, key=lambda loc: -history[loc])
+        first = [ loc for loc in self.killers[ply] if loc is not None ]
+        if ttmove is not None:
+            first = [ ttmove ] + [ loc for loc in first if loc != ttmove ]
+        if not first:
+            return moves
+        front = [ loc for loc in moves if loc in first ]
+        front.sort(key=first.index)
+        return front + [ loc for loc in moves if loc not in first ]
 
     # 递归搜索：返回最佳分数
-    def __search(self, turn, depth, alpha=-0x7fffffff, beta=0x7fffffff):
+    def __search(self, turn, depth, alpha=-0x7fffffff, beta=0x7fffffff, ply=0):
+
+        # 超时则放弃本轮迭代
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % Searcher.CHECK_EVERY == 0 \
+                and time.time() > self.deadline:
+            self.stopped = True
+        if self.stopped:
+            return 0
 
         # 深度为零则评估棋盘并返回
         if depth <= 0:
@@ -485,51 +690,299 @@ class Searcher(object):
 
         # 如果游戏结束则立马返回
         score = self.evaluator.evaluate(self.board, turn)
-        if abs(score) >= 9999 and depth < self.maxdepth:
+        if abs(score) >= 9999 and ply > 0:
             return score
 
+        # 查置换表：深度足够时直接用其分数，否则只用其最佳走法
+        key = self.__key(turn)
+        entry = self.tt.get(key)
+        ttmove = None
+        if entry is not None:
+            edepth, flag, value, ttmove = entry
+            if edepth >= depth and ply > 0:
+                if flag == Searcher.EXACT:
+                    return value
+                if flag == Searcher.LOWER and value >= beta:
+                    return value
+                if flag == Searcher.UPPER and value <= alpha:
+                    return value
+
         # 产生新的走法
-        moves = self.genmove(turn)
+        moves = self.__order(self.genmove(turn), ply, ttmove)
         bestmove = None
 
         # 枚举当前所有走法
-        for score, row, col in moves:
+        for loc in moves:
 
             # 标记当前走法到棋盘
-            self.board[row][col] = turn
+            self.__make(loc, turn)
 
             # 计算下一回合该谁走
             nturn = turn == 1 and 2 or 1
 
             # 深度优先搜索，返回评分，走的行和走的列
-            score = -self.__search(nturn, depth - 1, -beta, -alpha)
+            score = -self.__search(nturn, depth - 1, -beta, -alpha, ply + 1)
 
             # 棋盘上清除当前走法
-            self.board[row][col] = 0
+            self.__unmake()
+            if self.stopped:
+                return 0
 
             # 计算最好分值的走法
             # alpha/beta 剪枝
             if score > alpha:
                 alpha = score
-                bestmove = (row, col)
+                bestmove = loc
                 if alpha >= beta:
+                    killers = self.killers[ply]
+                    if killers[0] != bestmove:
+                        killers[1], killers[0] = killers[0], bestmove
+                    self.history[loc] += depth * depth
                     break
 
+        # 记入置换表
+        if alpha >= beta:
+            flag = Searcher.LOWER
+        elif bestmove is None:
+            flag = Searcher.UPPER
+        else:
+            flag = Searcher.EXACT
+        self._store(key, (depth, flag, alpha, ttmove if bestmove is None else bestmove))
+
         # 如果是第一层则记录最好的走法
-        if depth == self.maxdepth and bestmove:
+        if ply == 0 and bestmove is not None:
             self.bestmove = bestmove
 
         # 返回当前最好的分数，和该分数的对应走法
         return alpha
 
-    # 具体搜索：传入当前是该谁走(turn=1/2)，以及搜索深度(depth)
-    def search(self, turn, depth=3):
+    # 只搜根节点的一步棋 loc，给并行搜索用，超过 deadline 时返回 None
+    def search_move(self, turn, loc, depth, alpha=-0x7fffffff, beta=0x7fffffff, deadline=None):
+        self.evaluator.sync(self.board)
+        self.killers = [ [ None, None ] for i in range(depth + 1) ]
+        if len(self.history) != Board.BOARD_SIZE_SQ:
+            self.history = [ 0 for loc in range(Board.BOARD_SIZE_SQ) ]
+        self.deadline = deadline
+        self.stopped = False
+        self.nodes = 0
         self.maxdepth = depth
+        self.__make(loc, turn)
+        nturn = turn == 1 and 2 or 1
+        score = -self.__search(nturn, depth - 1, -beta, -alpha, 1)
+        self.__unmake()
+        self.deadline = None
+        self.evaluator.tracking = False
+        return None if self.stopped else score
+
+    # 以上一轮的分数为中心的期望窗口搜索，落在窗口外则用全窗口重搜
+    def __aspiration(self, turn, depth, guess):
+        if guess is None or abs(guess) > 8000:
+            return self.__search(turn, depth)
+        alpha, beta = guess - Searcher.ASPIRATION, guess + Searcher.ASPIRATION
+        score = self.__search(turn, depth, alpha, beta)
+        if not self.stopped and (score <= alpha or score >= beta):
+            score = self.__search(turn, depth)
+        return score
+
+    # 具体搜索 self.board：传入当前是该谁走(turn=1/2)，以及搜索深度(depth)，返回 (分数, 行, 列)
+    # 从第一层开始逐层加深，给了 time_budget(秒) 时到时间就用最后完成的一层的结果
+    def search(self, turn, depth=3, time_budget=None):
         self.bestmove = None
-        score = self.__search(turn, depth)
-        if abs(score) > 8000:
-            self.maxdepth = depth
-            score = self.__search(turn, 1)
-        row, col = self.bestmove
+        self.evaluator.sync(self.board)
+        self.killers = [ [ None, None ] for i in range(depth + 1) ]
+        self.history = [ 0 for loc in range(Board.BOARD_SIZE_SQ) ]
+        deadline = None if time_budget is None else time.time() + time_budget
+        self.deadline = None  # 第一层总要搜完
+        self.stopped = False
+        self.nodes = 0
+
+        best, score = None, None
+        for d in range(1, depth + 1):
+            self.maxdepth = d
+            if d == 2:
+                self.deadline = deadline
+            self.bestmove = None
+            s = self.__aspiration(turn, d, score)
+            if self.stopped:
+                break
+            score, best = s, self.bestmove
+            self.depth_reached = d
+            if abs(score) > 8000:  # 胜负已定就不必再加深，走最后一层找到的走法
+                break
+        self.deadline = None
+        self.evaluator.tracking = False
+        self.maxdepth = self.depth_reached
+        row, col = divmod(best, Eval.SZ)
+        return score, row, col
+
+    # 单进程搜索没有要释放的资源
+    def close(self):
+        pass
+
+
+class SharedTable(object):
+    '''
+    a transposition table in shared memory for the worker processes of
+    ParallelSearcher, the low bits of the hash pick a slot and a new entry
+    overwrites the old one. Slots are written without a lock: each keeps
+    its key xor its data next to the data, so a slot torn by two writers
+    reads as a miss.
+
+    Parameters
+    ------------
+    slots : int
+        number of entries
+    '''
+    NO_MOVE = 0
+
+    def __init__(self, slots=1 << 20):
+        self.slots = slots
+        self.buf = multiprocessing.RawArray('q', 2 * slots)
+        self._view = None
+
+    def __getstate__(self):
+        return { 'slots': self.slots, 'buf': self.buf }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._view = None
+
+    def view(self):
+        if self._view is None:
+            self._view = np.frombuffer(self.buf, dtype=np.int64)
+        return self._view
+
+    def get(self, key):
+        '''
+        Returns:
+        ------------
+        entry : tuple
+            (depth, bound type, score, best move) as Searcher.tt keeps it, None if missing
+        '''
+        v = self.view()
+        i = 2 * (key % self.slots)
+        check, data = int(v[i]), int(v[i + 1])
+        if data == 0 or check ^ data != SharedTable._signed(key):
+            return None
+        move = data & 0xffff
+        move = None if move == SharedTable.NO_MOVE else move - 1
+        return ((data >> 18) & 0xff, (data >> 16) & 0x3, (data >> 26) - (1 << 31), move)
+
+    def __setitem__(self, key, entry):
+        depth, flag, score, move = entry
+        move = SharedTable.NO_MOVE if move is None else move + 1
+        data = ((score + (1 << 31)) << 26) | (min(depth, 0xff) << 18) | (flag << 16) | move
+        v = self.view()
+        i = 2 * (key % self.slots)
+        v[i] = SharedTable._signed(key) ^ data
+        v[i + 1] = data
+
+    @staticmethod
+    def _signed(key):
+        return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class SharedSearcher(Searcher):
+    '''Searcher whose transposition table is a SharedTable'''
+
+    def __init__(self, table):
+        super().__init__()
+        self.tt = table
+
+    def _store(self, key, entry):
+        self.tt[key] = entry
+
+
+class ParallelSearcher(object):
+    '''
+    root splitting: every iteration of the deepening search hands the moves
+    at the root to a pool of worker processes, one move per task, each
+    worker searching with its own Searcher. The best score so far is shared
+    as the alpha bound of the tasks started later. It searches the board
+    set on it like Searcher and returns the same.
+
+    Parameters
+    ------------
+    workers : int
+        number of worker processes, all cores if None
+    shared_tt : bool
+        workers share one transposition table in shared memory instead of
+        keeping their own
+    tt_slots : int
+        entries of the shared table
+    '''
+
+    def __init__(self, workers=None, shared_tt=False, tt_slots=1 << 20):
+        # 进程池的工作进程是守护进程，不能再开子进程
+        if multiprocessing.current_process().daemon:
+            raise Exception('cannot start worker processes inside a pool worker')
+        self.workers = workers or multiprocessing.cpu_count()
+        self.alpha = multiprocessing.Value('i', -0x7fffffff)
+        table = SharedTable(tt_slots) if shared_tt else None
+        self.pool = multiprocessing.Pool(self.workers, _init_worker, (self.alpha, table))
+        self.local = Searcher()
+        self.board = Board()
+        self.depth_reached = 0
+
+    # 与 Searcher.search 相同：逐层加深，每一层把根节点的走法分给各进程
+    def search(self, turn, depth=3, time_budget=None):
+        deadline = None if time_budget is None else time.time() + time_budget
+        self.local.board = self.board
+        moves = self.local.genmove(turn)
+
+        best, score = None, None
+        for d in range(1, depth + 1):
+            results = self.__split(turn, d, moves, deadline if d > 1 else None)
+            if results is None:
+                break
+            score, best = max((s, -k) for k, (s, exact) in enumerate(results) if exact)
+            best = moves[-best]
+            self.depth_reached = d
+            if abs(score) > 8000:  # 胜负已定就不必再加深，走最后一层找到的走法
+                break
+            # 下一层先搜分数高的走法，alpha 会更早抬高
+            order = sorted(range(len(moves)), key=lambda k: (not results[k][1], -results[k][0], k))
+            moves = [ moves[k] for k in order ]
+
+        row, col = divmod(best, Eval.SZ)
         return score, row, col
 
+    # 并行搜一层，各走法返回 (分数, 是否高于开始时的 alpha)，超时返回 None
+    def __split(self, turn, depth, moves, deadline):
+        self.alpha.value = -0x7fffffff
+        tasks = [ (self.board.stones, turn, loc, depth, deadline) for loc in moves ]
+        results = self.pool.map(_root_worker, tasks, chunksize=1)
+        if any(r is None for r in results):
+            return None
+        return results
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+_searcher = None
+_alpha = None
+
+
+def _init_worker(alpha, table):
+    global _searcher, _alpha
+    _searcher = Searcher() if table is None else SharedSearcher(table)
+    _alpha = alpha
+
+
+def _root_worker(task):
+    stones, turn, loc, depth, deadline = task
+    if deadline is not None and time.time() > deadline:
+        return None
+    board = Board()
+    board.stones = stones
+    _searcher.board = board
+    alpha = _alpha.value
+    score = _searcher.search_move(turn, loc, depth, alpha, deadline=deadline)
+    if score is None:
+        return None
+    with _alpha.get_lock():
+        if score > _alpha.value:
+            _alpha.value = score
+    return score, score > alpha
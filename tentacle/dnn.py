@@ -242,6 +242,27 @@ class Pre(object):
         }
         return self.sess.run(self.value_outputs, feed_dict=feed_dict)
 
+    def get_move_probs_and_values(self, states):
+        '''
+        Parameters
+        ------------
+        states : 2d array
+            many states from adapt_state_batch, one per row
+
+        Returns:
+        ------------
+        probs : 2d array
+            move probabilities of every state
+        values : 1d array
+            value of every state, in one run of the session
+        '''
+        h, w, c = self.get_input_shape()
+        feed_dict = {
+            self.states_pl: states.reshape((-1, h, w, c)),
+        }
+        probs, values = self.sess.run([self.predict_probs, self.value_outputs], feed_dict=feed_dict)
+        return probs, values.ravel()
+
 
     def train(self, ith_part):
         Pre.NUM_STEPS = self.ds_train.num_examples // Pre.BATCH_SIZE
@@ -390,6 +411,19 @@ class Pre(object):
         legal = empty.astype(bool)
         return image, legal
 
+    def adapt_state_batch(self, boards):
+        '''adapt_state for an (N, BOARD_SIZE_SQ) array of boards at once'''
+        black = (boards == Board.STONE_BLACK)
+        white = (boards == Board.STONE_WHITE)
+        empty = (boards == Board.STONE_EMPTY)
+
+        # switch perspective of the boards where it is white turn
+        swap = (np.count_nonzero(black, axis=1) != np.count_nonzero(white, axis=1))[:, np.newaxis]
+        black, white = np.where(swap, white, black), np.where(swap, black, white)
+
+        image = np.stack((black, white, empty), axis=-1).reshape(boards.shape[0], -1).astype(float)
+        return image, empty
+
     def forge(self, row):
         board = row[:Board.BOARD_SIZE_SQ]
         image, _ = self.adapt_state(board)
@@ -525,7 +559,7 @@ class Pre(object):
         who, st0, st1 = last[0], last[1], last[2]
 
         oppo = Board.oppo(who)
-        oppo_will_win = Board.find_pattern_will_win(st1, oppo)
+        oppo_will_win = bool(st1.winning_moves(oppo))
         if oppo_will_win:
             return oppo
         return Board.STONE_EMPTY
@@ -1,3 +1,6 @@
+import multiprocessing
+import multiprocessing.util
+
 import numpy as np
 from tentacle.board import Board
 
@@ -25,14 +28,19 @@ class Game(object):
             self.q.put(('start',))
 
     def step(self):
-        moves, self.whose_turn, _ = Game.possible_moves(self.board)
+        self.whose_turn = Game.whose_turn_now(self.board)
 
         strat = self.strat1 if self.whose_turn == self.strat1.stand_for else self.strat2
 #         print('who', strat.stand_for)
 
         strat.update(self.board, None)
 
-        new_board = strat.preferred_board(self.board, moves, self)
+        loc = strat.preferred_loc(self.board, self)
+        if loc is None:
+            moves, _, _ = Game.possible_moves(self.board)
+            new_board = strat.preferred_board(self.board, moves, self)
+        else:
+            new_board = self.board.child(loc, self.whose_turn)
 #         print('who%d play at %s'%(self.whose_turn, str(divmod(Board.change(self.board, new_board), Board.BOARD_SIZE))))
 #         print(self.board.stones)
         if new_board.exploration:
@@ -79,40 +87,128 @@ class Game(object):
         who: int
             it is your turn
         '''
-        stat = np.bincount(board.stones, minlength=3)
-#         print('stone stat.')
-#         print(stat)
-
-        if  stat[Board.STONE_EMPTY] == 0:
-            return Board.STONE_EMPTY  # end
-        if  stat[Board.STONE_BLACK] == stat[Board.STONE_WHITE]:
-            return Board.STONE_BLACK  # black first, turn to black
-        if  stat[Board.STONE_BLACK] == stat[Board.STONE_WHITE] + 1:
-            return Board.STONE_WHITE  # turn to while
-        raise Exception("illegal state")
+        return board.whose_turn()
 
     @staticmethod
     def possible_moves(board):
         '''
         Returns:
         --------------
-            boards: Board list
+            boards: MoveList
+            who: int
+            locs: 1d array
         '''
 #         whose turn is it?
         who = Game.whose_turn_now(board)
 
 #         print("it is [%d]'s turn" % who)
 
-        boards = []
         loc = np.where(board.stones == 0)
 #         print(loc)
-        for i in loc[0]:
-            x = board.stones.copy()
-            x[i] = who
-            b = Board()
-            b.stones = x
-            boards.append(b)
+        boards = MoveList(board, who, loc[0])
 
 #         print('possible moves[%d]' % len(boards))
         return boards, who, loc[0]
 
+
+def play_games(make_strategies, episodes, workers=None):
+    '''
+    play games between two strategies in a pool of worker processes, every
+    worker builds its own pair once by make_strategies
+
+    Parameters
+    ------------
+    make_strategies : callable
+        picklable, returns the two strategies with stand_for set
+    episodes : int
+    workers : int
+        number of worker processes, all cores if None
+
+    Returns:
+    ------------
+    games : iterator
+        (moves, winner, step_counter, exploration_counter) of every game in
+        the order they end, moves are the (who, loc) of every step
+    '''
+    pool = multiprocessing.Pool(workers or multiprocessing.cpu_count(), _init_games, (make_strategies,))
+    finished = False
+    try:
+        for game in pool.imap_unordered(_play_game, range(episodes)):
+            yield game
+        finished = True
+    finally:
+        # workers let go normally close their strategies on the way out
+        if finished:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+
+_strategies = None
+
+
+def _init_games(make_strategies):
+    global _strategies
+    np.random.seed()
+    _strategies = make_strategies()
+    multiprocessing.util.Finalize(None, _close_games, exitpriority=10)
+
+
+def _close_games():
+    for s in _strategies:
+        s.close()
+
+
+def _play_game(_):
+    s1, s2 = _strategies
+    g = Game(Board(), s1, s2)
+    moves = []
+    while not g.over:
+        g.step()
+        g.step_counter += 1
+        moves.append((g.whose_turn, g.last_loc))
+    return moves, g.winner, g.step_counter, g.exploration_counter
+
+
+class MoveList(object):
+    '''
+    all possible next boards of a board, a board is built only when it is
+    indexed or iterated
+
+    Attributes:
+    ------------
+    board : Board
+        the board to move from
+    who : int
+        whose turn it is
+    locs : 1d array
+        the legal locations, the i-th board has a stone placed at locs[i]
+    '''
+    def __init__(self, board, who, locs):
+        self.board = board
+        self.who = who
+        self.locs = locs
+
+    def __len__(self):
+        return self.locs.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.board.child(loc, self.who) for loc in self.locs[i]]
+        return self.board.child(self.locs[i], self.who)
+
+    def __iter__(self):
+        for loc in self.locs:
+            yield self.board.child(loc, self.who)
+
+    def at(self, loc):
+        '''
+        Returns:
+        ------------
+        board : Board
+            the next board with a stone placed at loc
+        '''
+        if self.board.stones[loc] != Board.STONE_EMPTY:
+            raise Exception('cannot move here')
+        return self.board.child(loc, self.who)
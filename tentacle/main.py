@@ -12,7 +12,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from six.moves import queue
 from tentacle.board import Board
-from tentacle.game import Game
+from tentacle.game import Game, play_games
+from tentacle.selfplay import SelfPlay
 from tentacle.server import net
 from tentacle.strategy import StrategyHuman, StrategyMC, StrategyNetBot
 from tentacle.strategy import StrategyMCTS1
@@ -415,30 +416,21 @@ class Gui(object):
 #         plt.plot(rec)
 
 
-    def learn_from_2_teachers(self):
-        s1 = StrategyMinMax()
-        s1.stand_for = Board.STONE_BLACK
-        self.strategy_1 = s1
-
-        s2 = StrategyMinMax()
-        s2.stand_for = Board.STONE_WHITE
-        self.strategy_2 = s2
-
+    def learn_from_2_teachers(self, workers=None):
         observer = StrategyMC()
 
         win1, win2, draw = 0, 0, 0
         step_counter, explo_counter = 0, 0
         begin = datetime.datetime.now()
         episodes = 10000
-        for i in range(episodes):
-            g = Game(Board(), s1, s2, observer=observer)
-            g.step_to_end()
-            win1 += 1 if g.winner == Board.STONE_BLACK else 0
-            win2 += 1 if g.winner == Board.STONE_WHITE else 0
-            draw += 1 if g.winner == Board.STONE_EMPTY else 0
-
-            step_counter += g.step_counter
-            explo_counter += g.exploration_counter
+        for i, (moves, winner, steps, explos) in enumerate(play_games(_teachers, episodes, workers)):
+            Gui.replay(moves, observer)
+            win1 += 1 if winner == Board.STONE_BLACK else 0
+            win2 += 1 if winner == Board.STONE_WHITE else 0
+            draw += 1 if winner == Board.STONE_EMPTY else 0
+
+            step_counter += steps
+            explo_counter += explos
             print('training...%d' % i)
 
         total = win1 + win2 + draw
@@ -454,6 +446,18 @@ class Gui(object):
 
         observer.save('./brain1.npz')
 
+    @staticmethod
+    def replay(moves, observer):
+        '''feed a game played elsewhere to observer as Game does'''
+        observer.on_episode_start()
+        board = Board()
+        for who, loc in moves:
+            new_board = board.child(loc, who)
+            observer.swallow(who, board, new_board)
+            board = new_board
+        if moves:
+            observer.absorb(moves[-1][0])
+
 
     def from_new_start_point(self, winner, s1, s2):
         '''
@@ -528,15 +532,10 @@ class Gui(object):
         while True:
             print('iter:', i)
 
-            for _ in range(1000):
-                s1.stand_for = random.choice([Board.STONE_BLACK, Board.STONE_WHITE])
-                s2.stand_for = Board.oppo(s1.stand_for)
-
-                g = Game(Board.rand_generate_a_position(), s1, s2, observer=s1)
-                g.step_to_end()
-                win1 += 1 if g.winner == s1.stand_for else 0
-                win2 += 1 if g.winner == s2.stand_for else 0
-                draw += 1 if g.winner == Board.STONE_EMPTY else 0
+            w1, w2, d = SelfPlay(s1, s2).run(1000)
+            win1 += w1
+            win2 += w2
+            draw += d
 
 #             if win1 > win2:
 #                 s1_c = s1.mind_clone()
@@ -587,6 +586,10 @@ class Gui(object):
             elif msg[0] == 'move':
                 self.show(msg[1], msg[2])
                 redraw = True
+            elif msg[0] == 'undo':
+                if self.all_stones:
+                    self.all_stones.pop().remove()
+                redraw = True
             elif msg[0] == 'end':
                 self.ax.set_title(Gui.RESULT_MSG[msg[1]])
                 redraw = True
@@ -604,6 +607,15 @@ class Gui(object):
         net_t.start()
 
 
+def _teachers():
+    '''the two MinMax teachers of learn_from_2_teachers, built in each worker'''
+    s1 = StrategyMinMax()
+    s1.stand_for = Board.STONE_BLACK
+    s2 = StrategyMinMax()
+    s2.stand_for = Board.STONE_WHITE
+    return s1, s2
+
+
 if __name__ == '__main__':
     gui = Gui()
 
@@ -1,13 +1,9 @@
 import time
 
-from pybrain.datasets.supervised import SupervisedDataSet
-from pybrain.structure.modules.sigmoidlayer import SigmoidLayer
-from pybrain.supervised.trainers.backprop import BackpropTrainer
-from pybrain.tools.shortcuts import buildNetwork
-
 import numpy as np
 from tentacle.board import Board
 from tentacle.game import Game
+from tentacle.mlp import MLP
 
 
 class MonteCarlo(object):
@@ -25,11 +21,13 @@ class MonteCarlo(object):
 
         self.features_num = Board.BOARD_SIZE_SQ * 3 + 2
         self.hidden_neurons_num = self.features_num * 2
-        self.net = buildNetwork(self.features_num, self.hidden_neurons_num, 2, bias=True, outclass=SigmoidLayer)
-        self.trainer = BackpropTrainer(self.net)
+        self.net = MLP(self.features_num, self.hidden_neurons_num, 2)
 
         self.total_sim = 0
         self.observation = []
+        # samples of the simulations not trained on yet
+        self.samples_in = []
+        self.samples_out = []
 
 
     def select(self, board, moves, who, **kwargs):
@@ -53,6 +51,7 @@ class MonteCarlo(object):
             games += 1
             if games > 10:
                 break
+        self.train_pending()
 
         self.stats.update(games=games, max_depth=self.max_depth, time=str(time.time() - begin))
         print(self.stats['games'], self.stats['time'])
@@ -76,38 +75,68 @@ class MonteCarlo(object):
 
         self.total_sim += 1
 
-        ds = SupervisedDataSet(self.features_num, 2)
         for player, state, new, val in visited_path:
-            plays = val[1] * self.total_sim + 1
-            wins = val[0] * self.total_sim
-            if player == winner:
-                wins += 1
-            ds.addSample(self.get_input_values(state, new, player), (wins, plays))
-        self.trainer.trainOnDataset(ds)
+            self.samples_in.append(self.get_input_values(state, new, player))
+            self.samples_out.append(self.target(val, player == winner))
 
+    def train_pending(self):
+        '''train the net on the samples of all simulations since the last call, in one batch'''
+        if not self.samples_in:
+            return
+        self.net.train(np.array(self.samples_in), np.array(self.samples_out))
+        self.samples_in = []
+        self.samples_out = []
+
+    def target(self, val, won):
+        '''
+        Returns:
+        ------------
+        target : tuple
+            (wins, plays) estimated before plus this result
+        '''
+        plays = val[1] * self.total_sim + 1
+        wins = val[0] * self.total_sim
+        if won:
+            wins += 1
+        return wins, plays
 
     def get_best(self, state, moves, who):
-        outputs = []
-        for s in moves:
-            out = self.net.activate(self.get_input_values(state, s, who))
-            outputs.append(out)
-        a = np.array(outputs)
+        '''
+        score every move of moves by one pass of the net over all of them
+
+        Returns:
+        ------------
+        board : Board
+            the board after the best move
+        val : 1d array
+            the output of the net for it
+        '''
+        a = self.net.activate_batch(self.get_input_batch(state, moves.locs, who))
         b = a[:, 0] / a[:, 1] + self.C * np.log(np.sum(a[:, 1])) / a[:, 1]
         i = np.argmax(b)
         return moves[i], a[i]
 
-
-    def get_input_values(self, board, new_board, who):
+    def get_input_batch(self, board, locs, who):
+        '''
+        Returns:
+        ------------
+        inputs : 2d array
+            the input vector of the move at each of locs, one per row
+        '''
         v = board.stones
         sz = v.shape[0]
-        iv = np.zeros(self.features_num)
-        iv[0:sz] = (v == Board.STONE_BLACK).astype(int)
-        iv[sz:sz * 2] = (v == Board.STONE_WHITE).astype(int)
-        iv[sz * 2:sz * 3] = (new_board.stones != v).astype(int)
-        iv[-2] = 1 if who == Board.STONE_BLACK else 0  # turn to black move
-        iv[-1] = 1 if who == Board.STONE_WHITE else 0  # turn to white move
+        iv = np.zeros((len(locs), self.features_num))
+        iv[:, 0:sz] = (v == Board.STONE_BLACK)
+        iv[:, sz:sz * 2] = (v == Board.STONE_WHITE)
+        iv[np.arange(len(locs)), sz * 2 + np.asarray(locs)] = 1
+        iv[:, -2] = 1 if who == Board.STONE_BLACK else 0  # turn to black move
+        iv[:, -1] = 1 if who == Board.STONE_WHITE else 0  # turn to white move
         return iv
 
+    def get_input_values(self, board, new_board, who):
+        loc = np.flatnonzero(new_board.stones != board.stones)
+        return self.get_input_batch(board, loc, who)[0]
+
 
     def swallow(self, who, st0, st1, **kwargs):
         self.observation.append((who, st0, st1))
@@ -115,18 +144,13 @@ class MonteCarlo(object):
     def absorb(self, winner, **kwargs):
         self.total_sim += 1
 
-        ds = SupervisedDataSet(self.features_num, 2)
-        for who, s0, s1 in self.observation:
-            if who != Board.STONE_BLACK:
-                continue
-            input_vec = self.get_input_values(s0, s1, who)
-            val = self.net.activate(input_vec)
-            plays = val[1] * self.total_sim + 1
-            wins = val[0] * self.total_sim
-            if who == winner:
-                wins += 1
-            ds.addSample(input_vec, (wins, plays))
-        self.trainer.trainOnDataset(ds)
+        inputs = [self.get_input_values(s0, s1, who) for who, s0, s1 in self.observation if who == Board.STONE_BLACK]
+        if not inputs:
+            return
+        inputs = np.array(inputs)
+        vals = self.net.activate_batch(inputs)
+        targets = np.array([self.target(val, Board.STONE_BLACK == winner) for val in vals])
+        self.net.train(inputs, targets)
 
     def void(self):
         self.observation = []
@@ -0,0 +1,587 @@
+import multiprocessing
+import time
+
+import numpy as np
+from tentacle.board import Board
+
+
+class NodeArena(object):
+    '''
+    all nodes of a search tree in preallocated arrays, a node is a row index.
+    The statistics of all moves of a node sit side by side in its row, so
+    picking a move is one vectorised argmax, and the memory used is fixed
+    by capacity however long the tree is kept.
+
+    Attributes:
+    ------------------
+    N : 2d array
+        visit count of every move of every node
+    W : 2d array
+        total value of every move, from the view of the side to move at the node
+    P : 2d array
+        prior probability of every move, zero for occupied locations
+    child : 2d array
+        row of the node reached by every move, -1 if not expanded
+    parent : 1d array
+        row of the parent node, -1 for a root or a free row
+    parent_loc : 1d array
+        the move leading from the parent
+    hash : 1d array
+        hash of the position
+    table : dict
+        hash -> row of every node, only kept when transpositions is True,
+        the nodes then form a graph where a row may have many parents
+    '''
+
+    def __init__(self, capacity, transpositions=False):
+        width = Board.BOARD_SIZE_SQ
+        self.capacity = capacity
+        self.N = np.zeros((capacity, width), np.float32)
+        self.W = np.zeros((capacity, width), np.float32)
+        self.P = np.zeros((capacity, width), np.float32)
+        self.child = np.full((capacity, width), -1, np.int32)
+        self.parent = np.full(capacity, -1, np.int32)
+        self.parent_loc = np.full(capacity, -1, np.int32)
+        self.hash = np.zeros(capacity, np.uint64)
+        self.used = np.zeros(capacity, bool)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.table = {} if transpositions else None
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def clear(self):
+        self.child[self.used] = -1
+        self.parent[:] = -1
+        self.used[:] = False
+        self.free = list(range(self.capacity - 1, -1, -1))
+        if self.table is not None:
+            self.table = {}
+
+    def alloc(self, prior, hash, parent=-1, loc=-1):
+        '''
+        Returns:
+        ------------
+        i : int
+            row of a new node, linked under parent by loc
+        '''
+        i = self.free.pop()
+        self.N[i] = 0
+        self.W[i] = 0
+        self.P[i] = prior
+        self.hash[i] = hash
+        self.parent[i] = parent
+        self.parent_loc[i] = loc
+        self.used[i] = True
+        if parent >= 0:
+            self.child[parent, loc] = i
+        if self.table is not None:
+            self.table[hash] = i
+        return i
+
+    def release(self, i):
+        '''free node i and the whole subtree below it'''
+        if self.parent[i] >= 0:
+            self.child[self.parent[i], self.parent_loc[i]] = -1
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            row = self.child[j]
+            stack.extend(row[row >= 0].tolist())
+            row[:] = -1
+            self.parent[j] = -1
+            self.used[j] = False
+            self.free.append(j)
+
+    def reserve(self, k, root):
+        '''
+        make at least k rows free, evicting the least visited leaves other
+        than root, their visits stay on the edges of their parents. Leaves
+        are evicted bottom up, a node whose children are all gone is a leaf
+        of the next round.
+        '''
+        if len(self.free) >= k:
+            return
+        # evict a sixteenth of the arena at once to keep the scans rare
+        need = max(k - len(self.free), self.capacity // 16)
+        while need > 0:
+            leaf = self.used & (self.child.max(axis=1) < 0) & (self.parent >= 0)
+            if root >= 0:
+                leaf[root] = False
+            rows = np.flatnonzero(leaf)
+            if rows.size == 0:
+                break
+            visits = self.N[self.parent[rows], self.parent_loc[rows]]
+            for i in rows[np.argsort(visits, kind='mergesort')[:need]]:
+                self.release(int(i))
+            need -= min(need, rows.size)
+        self._check_free(k)
+
+    def _check_free(self, k):
+        if len(self.free) < k:
+            raise Exception('node arena full: %d rows needed, %d free' % (k, len(self.free)))
+
+    def reserve_graph(self, k, root):
+        '''
+        reserve for a graph of transpositions, nodes no longer reachable from
+        root go first, then the least visited reachable leaves
+        '''
+        if len(self.free) >= k:
+            return
+        need = max(k - len(self.free), self.capacity // 16)
+        while need > 0:
+            reachable = self.reachable(root) if root >= 0 else np.zeros(self.capacity, bool)
+            edges = self.child[self.used]
+            linked = edges >= 0
+            visits = np.bincount(edges[linked], weights=self.N[self.used][linked], minlength=self.capacity)
+            leaf = self.child.max(axis=1) < 0
+            candidates = self.used & (~reachable | leaf)
+            if root >= 0:
+                candidates[root] = False
+            rows = np.flatnonzero(candidates)
+            if rows.size == 0:
+                break
+            evict = rows[np.lexsort((visits[rows], reachable[rows]))[:need]]
+
+            self.child[np.isin(self.child, evict)] = -1
+            for i in evict.tolist():
+                self.child[i] = -1
+                self.parent[i] = -1
+                self.used[i] = False
+                self.free.append(i)
+                if self.table.get(int(self.hash[i])) == i:
+                    del self.table[int(self.hash[i])]
+            need -= evict.size
+        self._check_free(k)
+
+    def reachable(self, root):
+        '''
+        Returns:
+        ------------
+        seen : 1d array
+            True for the rows reachable from root
+        '''
+        seen = np.zeros(self.capacity, bool)
+        seen[root] = True
+        frontier = np.array([root])
+        while frontier.size:
+            rows = self.child[frontier].ravel()
+            rows = np.unique(rows[rows >= 0])
+            frontier = rows[~seen[rows]]
+            seen[frontier] = True
+        return seen
+
+    def select(self, i, c_puct):
+        '''
+        Returns:
+        ------------
+        loc : int
+            the move of node i with the highest Q + U
+        '''
+        n, p = self.N[i], self.P[i]
+        q = self.W[i] / np.maximum(n, 1)
+        u = c_puct * p * np.sqrt(n.sum() + 1) / (1 + n)
+        return int(np.argmax(np.where(p > 0, q + u, -np.inf)))
+
+
+class MCTS1(object):
+    '''
+    PUCT tree search guided by a policy and a value function
+
+    Parameters
+    ------------
+    value_fn : callable
+        value_fn(board) -> value of board for the side to move, in [-1, 1]
+    policy_fn : callable
+        policy_fn(board) -> prior over all BOARD_SIZE_SQ locations
+    rollout_fn : callable
+        rollout_fn(board, legal) -> move probabilities used to play out a
+        leaf, only called when lmbda > 0
+    c_puct : float
+        weight of the prior against the value in selection
+    n_playout : int
+        simulations per move, None for no limit besides time_budget
+    time_budget : float
+        seconds per move, stops the search before n_playout if not None
+    lmbda : float
+        mix of the rollout result into the leaf value
+    batch_fn : callable
+        batch_fn(stones) -> (probs, values) for many boards in one call,
+        leaves are then evaluated batch_size at a time
+    batch_size : int
+        leaves collected per round when batch_fn is given
+    virtual_loss : float
+        visits counted as lost on a path while its leaf waits for evaluation,
+        keeps the leaves of one round apart
+    capacity : int
+        most nodes kept, the least visited leaves are evicted beyond it
+    root_noise : float
+        weight of Dirichlet noise mixed into the root prior, lets independent
+        searches of one position explore differently
+    '''
+
+    def __init__(self, value_fn, policy_fn, rollout_fn=None, c_puct=5, n_playout=400, time_budget=None, lmbda=0,
+                 batch_fn=None, batch_size=8, virtual_loss=3, capacity=8192, root_noise=0):
+        if n_playout is None and time_budget is None:
+            raise Exception('either n_playout or time_budget is needed')
+        self.value_fn = value_fn
+        self.policy_fn = policy_fn
+        self.rollout_fn = rollout_fn
+        self.batch_fn = batch_fn
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.c_puct = c_puct
+        self.n_playout = n_playout
+        self.time_budget = time_budget
+        self.lmbda = lmbda
+        self.root_noise = root_noise
+        self.tree = NodeArena(capacity)
+        self.root = -1
+        self.stats = {}
+
+    def get_move(self, board):
+        '''
+        Returns:
+        ------------
+        loc : int
+            the most visited move after the search
+        '''
+        return int(np.argmax(self.search(board)))
+
+    def search(self, board):
+        '''
+        Returns:
+        ------------
+        visits : 1d array
+            visit count of every move at the root after the search
+        '''
+        board = board.copy()
+        tree = self.tree
+        self._reroot(board)
+        if self.root < 0:
+            self._reserve(1)
+            self.root = self._expand(board)[0]
+        # the noise is mixed into the root prior for this search only, a kept root gets fresh noise next time
+        prior = tree.P[self.root].copy()
+        if self.root_noise > 0:
+            legal = prior > 0
+            noise = np.random.dirichlet(np.full(np.count_nonzero(legal), 0.3))
+            tree.P[self.root, legal] = (1 - self.root_noise) * prior[legal] + self.root_noise * noise
+
+        limit = np.inf if self.n_playout is None else self.n_playout
+        sims, evals = 0, 0
+        begin = time.time()
+        try:
+            while sims < limit:
+                k = 1 if self.batch_fn is None else int(min(self.batch_size, limit - sims))
+                self._reserve(k)
+                if self.batch_fn is None:
+                    self._playout(board)
+                else:
+                    self._playout_batch(board, k)
+                sims += k
+                evals += 1
+                if self.time_budget is not None and time.time() - begin > self.time_budget:
+                    break
+        finally:
+            tree.P[self.root] = prior
+
+        cost = time.time() - begin
+        self.stats.update(sims=sims, evals=evals, time=cost, sims_per_sec=sims / max(cost, 1e-9), nodes=len(tree))
+        return tree.N[self.root].copy()
+
+    def update_with_move(self, loc):
+        '''step the root to the child at loc, keeping its subtree and freeing the rest'''
+        tree = self.tree
+        if self.root < 0:
+            return
+        new_root = int(tree.child[self.root, loc])
+        if new_root >= 0:
+            tree.child[self.root, loc] = -1
+            tree.parent[new_root] = -1
+        tree.release(self.root)
+        self.root = new_root
+
+    def _reroot(self, board):
+        '''
+        move the root to the node of board if it is the root, a child or a
+        grandchild, so the search goes on without update_with_move, else
+        drop the tree
+        '''
+        tree = self.tree
+        if self.root < 0 or tree.hash[self.root] == board.hash:
+            return
+        children = tree.child[self.root]
+        children = children[children >= 0]
+        grandchildren = tree.child[children].ravel()
+        for rows in (children, grandchildren[grandchildren >= 0]):
+            found = rows[tree.hash[rows] == board.hash]
+            if found.size:
+                node = int(found[0])
+                path = []
+                while node != self.root:
+                    path.append(int(tree.parent_loc[node]))
+                    node = int(tree.parent[node])
+                for loc in reversed(path):
+                    self.update_with_move(loc)
+                return
+        tree.release(self.root)
+        self.root = -1
+
+    def _reserve(self, k):
+        self.tree.reserve(k, self.root)
+
+    def _lookup(self, board, node, loc):
+        '''
+        Returns:
+        ------------
+        child : int
+            a node already kept for board, now linked under node by loc, -1 if none
+        '''
+        return -1
+
+    def _leaf_key(self, board, node, loc):
+        '''leaves of one round with the same key are evaluated once'''
+        return node, loc
+
+    def _playout(self, board):
+        '''one simulation from the root, board is back to the root position afterwards'''
+        tree = self.tree
+        node = self.root
+        path = []
+        while True:
+            loc = tree.select(node, self.c_puct)
+            path.append((node, loc))
+            if board.push(loc):
+                # the side that just moved made five or filled the board
+                value = 1. if board.winner != Board.STONE_EMPTY else 0.
+                break
+            child = tree.child[node, loc]
+            if child < 0:
+                child = self._lookup(board, node, loc)
+                if child >= 0 and tree.N[child].sum() > 0:
+                    # a transposition already searched, its mean value stands for this leaf
+                    value = -tree.W[child].sum() / tree.N[child].sum()
+                    break
+            if child < 0:
+                _, leaf_value = self._expand(board, node, loc)
+                value = -leaf_value
+                break
+            node = child
+
+        for node, loc in reversed(path):
+            tree.N[node, loc] += 1
+            tree.W[node, loc] += value
+            value = -value
+            board.pop()
+
+    def _playout_batch(self, board, k):
+        '''
+        k simulations from the root under virtual loss, their leaves are
+        evaluated by one call of batch_fn
+        '''
+        tree = self.tree
+        vl = self.virtual_loss
+        paths, ends, keys, leaves = [], [], [], {}
+        for _ in range(k):
+            node = self.root
+            path = []
+            end, key = None, None
+            while True:
+                loc = tree.select(node, self.c_puct)
+                path.append((node, loc))
+                tree.N[node, loc] += vl
+                tree.W[node, loc] -= vl
+                if board.push(loc):
+                    end = 1. if board.winner != Board.STONE_EMPTY else 0.
+                    break
+                child = tree.child[node, loc]
+                if child < 0:
+                    child = self._lookup(board, node, loc)
+                    if child >= 0 and tree.N[child].sum() > 0:
+                        end = -tree.W[child].sum() / tree.N[child].sum()
+                        break
+                if child < 0:
+                    # a leaf already waiting in this round is evaluated once
+                    key = self._leaf_key(board, node, loc)
+                    if key not in leaves:
+                        leaves[key] = (board.stones.copy(), board.hash, [])
+                    leaves[key][2].append((node, loc))
+                    break
+                node = child
+            for _ in path:
+                board.pop()
+            paths.append(path)
+            ends.append(end)
+            keys.append(key)
+
+        values = {}
+        if leaves:
+            pending = list(leaves.items())
+            probs, leaf_values = self.batch_fn(np.array([stones for _, (stones, _, _) in pending]))
+            for (key, (stones, hash, edges)), p, v in zip(pending, probs, leaf_values):
+                node, loc = edges[0]
+                child = self._make_node(stones, p, hash, node, loc)
+                for node, loc in edges[1:]:
+                    tree.child[node, loc] = child
+                values[key] = float(v)
+
+        for path, end, key in zip(paths, ends, keys):
+            value = end if key is None else -values[key]
+            for node, loc in reversed(path):
+                tree.N[node, loc] += 1 - vl
+                tree.W[node, loc] += value + vl
+                value = -value
+
+    def _make_node(self, stones, probs, hash, parent=-1, loc=-1):
+        legal = stones == Board.STONE_EMPTY
+        prior = np.where(legal, np.ravel(probs), 0)
+        s = prior.sum()
+        prior = prior / s if s > 0 else legal / np.count_nonzero(legal)
+        return self.tree.alloc(prior, hash, parent, loc)
+
+    def _expand(self, board, parent=-1, loc=-1):
+        '''
+        Returns:
+        ------------
+        node : int
+            a new node for board, linked under parent by loc
+        value : float
+            value of board for the side to move
+        '''
+        node = self._make_node(board.stones, self.policy_fn(board), board.hash, parent, loc)
+        value = float(np.ravel(self.value_fn(board))[0])
+        if self.lmbda > 0:
+            value = (1 - self.lmbda) * value + self.lmbda * self._rollout(board)
+        return node, value
+
+    def _rollout(self, board):
+        '''
+        Returns:
+        ------------
+        value : float
+            result of playing out board by rollout_fn, for the side to move
+        '''
+        who = board.whose_turn()
+        plies = 0
+        while not board.over:
+            legal = board.stones == Board.STONE_EMPTY
+            probs = np.ravel(self.rollout_fn(board, legal))
+            board.push(int(np.argmax(np.where(legal, probs, -1))))
+            plies += 1
+        winner = board.winner
+        for _ in range(plies):
+            board.pop()
+        if winner == Board.STONE_EMPTY:
+            return 0.
+        return 1. if winner == who else -1.
+
+
+class TranspositionMCTS(MCTS1):
+    '''
+    MCTS1 over a graph of positions, the moves of different orders that
+    reach one position lead to one shared node found by its hash. Visits
+    and values stay on the edges, so the backup along the path taken is
+    the same as in the tree, while the prior and the statistics below a
+    transposed node are shared. Nodes are kept across moves as long as
+    the arena has room, a later root is looked up in the table directly.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tree = NodeArena(self.tree.capacity, transpositions=True)
+
+    def update_with_move(self, loc):
+        if self.root >= 0:
+            self.root = int(self.tree.child[self.root, loc])
+
+    def _reroot(self, board):
+        self.root = self.tree.table.get(board.hash, -1)
+
+    def _reserve(self, k):
+        self.tree.reserve_graph(k, self.root)
+
+    def _lookup(self, board, node, loc):
+        child = self.tree.table.get(board.hash, -1)
+        if child >= 0:
+            self.tree.child[node, loc] = child
+        return child
+
+    def _leaf_key(self, board, node, loc):
+        return board.hash
+
+
+def _serve(conn, make_engine):
+    '''a root parallel worker, searches every position sent on conn until None comes'''
+    np.random.seed()
+    engine = make_engine()
+    while True:
+        stones = conn.recv()
+        if stones is None:
+            break
+        board = Board()
+        board.stones = stones
+        conn.send(engine.search(board))
+    conn.close()
+
+
+class RootParallelMCTS(object):
+    '''
+    root parallel search, every worker process runs its own MCTS1 with its
+    own model and tree from the same position until its time budget runs
+    out, the root visit counts of all workers are summed to pick the move.
+    Each worker has a pipe of its own, so every search sends it exactly one
+    position.
+
+    Parameters
+    ------------
+    make_engine : callable
+        picklable, builds the MCTS1 of a worker inside the worker process
+    workers : int
+        number of worker processes, all cores if None
+    '''
+
+    def __init__(self, make_engine, workers=None):
+        if multiprocessing.current_process().daemon:
+            raise Exception('cannot start worker processes inside a pool worker')
+        self.workers = workers or multiprocessing.cpu_count()
+        self.conns, self.procs = [], []
+        for _ in range(self.workers):
+            conn, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(target=_serve, args=(child, make_engine), daemon=True)
+            proc.start()
+            child.close()
+            self.conns.append(conn)
+            self.procs.append(proc)
+
+    def get_move(self, board):
+        '''
+        Returns:
+        ------------
+        loc : int
+            the move with the most visits over all workers
+        '''
+        return int(np.argmax(self.search(board)))
+
+    def search(self, board):
+        '''
+        Returns:
+        ------------
+        visits : 1d array
+            root visit counts summed over all workers
+        '''
+        for conn in self.conns:
+            conn.send(board.stones)
+        return np.sum([conn.recv() for conn in self.conns], axis=0)
+
+    def update_with_move(self, loc):
+        '''workers find the new root by hash on their next search'''
+        pass
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(None)
+            conn.close()
+        for proc in self.procs:
+            proc.join()
+        self.conns, self.procs = [], []
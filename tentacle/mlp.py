@@ -0,0 +1,100 @@
+import numpy as np
+from scipy.special import expit
+
+
+class MLP(object):
+    '''
+    a fully connected net with one sigmoid hidden layer and sigmoid outputs,
+    laid out like pybrain's buildNetwork(n_in, n_hidden, n_out, bias=True,
+    outclass=SigmoidLayer), but every method takes many inputs at once
+
+    Attributes:
+    ------------------
+    hidden_weights : 2d array
+        shape (n_hidden, n_in)
+    hidden_bias : 1d array
+    output_weights : 2d array
+        shape (n_out, n_hidden)
+    output_bias : 1d array
+    learning_rate : float
+    '''
+
+    def __init__(self, n_in, n_hidden, n_out, learning_rate=0.01):
+        self.hidden_weights = np.random.randn(n_hidden, n_in)
+        self.hidden_bias = np.random.randn(n_hidden)
+        self.output_weights = np.random.randn(n_out, n_hidden)
+        self.output_bias = np.random.randn(n_out)
+        self.learning_rate = learning_rate
+
+    def activate(self, inputs):
+        '''one input vector to one output vector, as pybrain's activate'''
+        return self.activate_batch(inputs[np.newaxis, :])[0]
+
+    def activate_batch(self, inputs):
+        '''
+        Parameters
+        ------------
+        inputs : 2d array
+            one input vector per row
+
+        Returns:
+        ------------
+        outputs : 2d array
+            one output vector per row
+        '''
+        return self.forward(inputs)[1]
+
+    def forward(self, inputs):
+        '''
+        Returns:
+        ------------
+        hiddens : 2d array
+            activations of the hidden layer
+        outputs : 2d array
+        '''
+        hiddens = expit(inputs.dot(self.hidden_weights.T) + self.hidden_bias)
+        outputs = expit(hiddens.dot(self.output_weights.T) + self.output_bias)
+        return hiddens, outputs
+
+    def train(self, inputs, targets):
+        '''
+        one step of gradient descent on the squared error summed over all rows
+
+        Returns:
+        ------------
+        error : float
+            mean squared error before the step
+        '''
+        hiddens, outputs = self.forward(inputs)
+        err = outputs - targets
+        d_out = err * outputs * (1 - outputs)
+        d_hidden = d_out.dot(self.output_weights) * hiddens * (1 - hiddens)
+
+        lr = self.learning_rate
+        self.output_weights -= lr * d_out.T.dot(hiddens)
+        self.output_bias -= lr * d_out.sum(axis=0)
+        self.hidden_weights -= lr * d_hidden.T.dot(inputs)
+        self.hidden_bias -= lr * d_hidden.sum(axis=0)
+        return float(np.mean(err ** 2))
+
+    @staticmethod
+    def from_pybrain(net, learning_rate=0.01):
+        '''
+        copy the weights of a network made by pybrain's buildNetwork with
+        bias=True and one hidden layer
+
+        Returns:
+        ------------
+        mlp : MLP
+        '''
+        def params(src, dst):
+            conn = [c for c in net.connections[net[src]] if c.outmod is net[dst]][0]
+            return conn.params.reshape((conn.outdim, conn.indim)).copy()
+
+        w1 = params('in', 'hidden0')
+        mlp = MLP(w1.shape[1], w1.shape[0], net['out'].indim, learning_rate)
+        mlp.hidden_weights = w1
+        mlp.hidden_bias = params('bias', 'hidden0').ravel()
+        mlp.output_weights = params('hidden0', 'out')
+        mlp.output_bias = params('bias', 'out').ravel()
+        return mlp
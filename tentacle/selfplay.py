@@ -0,0 +1,112 @@
+import numpy as np
+from tentacle.board import Board
+from tentacle.board_batch import BoardBatch
+
+
+class SelfPlay(object):
+    '''
+    plays many games between two StrategyDNN in lockstep, every ply the
+    positions of all games where one brain is to move go through its
+    network in a single run of the session
+
+    Attributes:
+    ------------
+    learner : StrategyDNN
+        plays a random side in every game and is fed every finished game
+    opponent : StrategyDNN
+        plays the other side, may be the learner itself
+    parallel : int
+        number of games in flight
+    start_position : callable
+        returns the board a game starts from
+    '''
+    def __init__(self, learner, opponent, parallel=256, start_position=Board.rand_generate_a_position):
+        self.learner = learner
+        self.opponent = opponent
+        self.parallel = parallel
+        self.start_position = start_position
+
+    def run(self, episodes):
+        '''
+        Returns:
+        ------------
+        wins : int
+            games won by the learner
+        losses : int
+            games won by the opponent
+        draws : int
+        '''
+        n = min(self.parallel, episodes)
+        starts = [self.start_position() for _ in range(n)]
+        batch = BoardBatch.from_boards(starts)
+        sides = np.random.choice([Board.STONE_BLACK, Board.STONE_WHITE], n)
+        records = [[] for _ in range(n)]
+        started, finished = n, 0
+        wins, losses, draws = 0, 0, 0
+
+        while finished < episodes:
+            live = ~batch.done
+            locs = np.zeros(n, int)
+            if self.opponent is self.learner:
+                turns = ((self.learner, live),)
+            else:
+                learner_turn = live & (batch.turn == sides)
+                turns = ((self.learner, learner_turn), (self.opponent, live & ~learner_turn))
+            for strat, games in turns:
+                if np.any(games):
+                    locs[games] = self._choose(strat, batch.stones[games])
+
+            for i in np.flatnonzero(live):
+                records[i].append(locs[i])
+            ended = batch.play(locs)
+
+            for i in np.flatnonzero(ended):
+                winner = int(batch.winner[i])
+                wins += 1 if winner == sides[i] else 0
+                losses += 1 if winner == Board.oppo(sides[i]) else 0
+                draws += 1 if winner == Board.STONE_EMPTY else 0
+                self._feed(starts[i], records[i], sides[i])
+                finished += 1
+
+                if started < episodes:
+                    starts[i] = self.start_position()
+                    batch.set_board(i, starts[i])
+                    sides[i] = np.random.choice([Board.STONE_BLACK, Board.STONE_WHITE])
+                    records[i] = []
+                    started += 1
+
+        return wins, losses, draws
+
+    def _choose(self, strat, stones):
+        '''
+        Returns:
+        ------------
+        locs : 1d array
+            the move of strat in every position
+        '''
+        state, legal = strat.brain.adapt_state_batch(stones)
+        probs = strat.brain.get_move_probs(state)
+        locs = np.argmax(np.where(legal, probs, -1), axis=1)
+
+        exploration = strat.exploration if strat.brain.is_rl else strat.final_exp
+        explore = np.random.rand(stones.shape[0]) < exploration
+        if np.any(explore):
+            rand = np.random.rand(np.count_nonzero(explore), stones.shape[1])
+            locs[explore] = np.argmax(np.where(legal[explore], rand, -1), axis=1)
+        return locs
+
+    def _feed(self, start, record, side):
+        '''
+        replay a finished game through the learner's swallow/absorb like Game
+        does, which absorbs the side that made the last move, a draw included
+        '''
+        learner = self.learner
+        learner.stand_for = side
+        learner.on_episode_start()
+        board = start
+        for loc in record:
+            who = board.whose_turn()
+            new_board = board.child(loc, who)
+            learner.swallow(who, board, new_board)
+            board = new_board
+        learner.absorb(who)
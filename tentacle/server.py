@@ -89,7 +89,15 @@ def dispose_msg(msg, msg_queue):
         who = board.get(x, y)
         print('player %d win the game' % (who,))
     elif seq[0] == 'UNDO:':
-        ans = 'UNDO: unsupported yet'
+        if not board.history:
+            ans = 'UNDO: nothing to undo'
+        elif len(seq) >= 3 and board.last_loc != int(seq[1]) * Board.BOARD_SIZE + int(seq[2]):
+            ans = 'UNDO: not the last move'
+        else:
+            loc = board.pop()
+            ans = 'UNDO: OK'
+            if msg_queue is not None:
+                msg_queue.put(('undo', loc))
     elif seq[0] == 'WHERE:':
         if who_first is None:
             who_first = Board.STONE_BLACK
@@ -1,4 +1,5 @@
 from _hashlib import new
+from functools import partial
 import pickle
 import random
 
@@ -7,11 +8,13 @@ from scipy.special import expit
 import matplotlib.pyplot as plt
 import numpy as np
 from tentacle.board import Board
-from tentacle.dfs import Searcher
+from tentacle.dfs import Searcher, ParallelSearcher
 from tentacle.dnn3 import DCNN3
 from tentacle.game import Game
 from tentacle.mcts import MonteCarlo
-from tentacle.mcts1 import MCTS1
+from tentacle.mcts1 import MCTS1, RootParallelMCTS, TranspositionMCTS
+from tentacle.mlp import MLP
+from tentacle.threat_space import ThreatSolver
 
 
 class Strategy(object):
@@ -31,6 +34,36 @@ class Strategy(object):
     def preferred_move(self, board):
         pass
 
+    def preferred_loc(self, board, context):
+        '''
+        a strategy that can tell where to place without looking at every
+        possible next board overrides this, then Game skips building them
+
+        Returns:
+        ------------
+        loc : int
+            the preferred location, None to fall back on preferred_board
+        '''
+        return None
+
+    def urgent_loc(self, board, who):
+        '''
+        the move that cannot wait, read from the threat map of board
+
+        Returns:
+        ------------
+        loc : int
+            a winning move of who, else the block of an opponent's winning
+            move, None if neither exists
+        '''
+        wins = board.winning_moves(who)
+        if wins:
+            return wins[0]
+        blocks = board.forced_blocks(who)
+        if blocks:
+            return blocks[0]
+        return None
+
     def preferred_board(self, old, moves, context):
         '''
         Parameters
@@ -38,7 +71,7 @@ class Strategy(object):
         old : board
             the old board
             
-        moves: list(board)
+        moves: MoveList
             all possible moves
             
         context: hash
@@ -168,8 +201,45 @@ class StrategyTD(StrategyProb):
             the_board.exploration = True
             return the_board
         else:
-            board_most_value = max(moves, key=lambda m: self.board_value(m, context))
-            return board_most_value
+            values = self.move_values(old, moves.locs, moves.who)
+            return moves[int(np.argmax(values))]
+
+    def move_values(self, board, locs, who):
+        '''
+        the value of the boards after who places at each of locs, by one
+        pass of both layers over all of them
+
+        Returns:
+        ------------
+        values : 1d array
+        '''
+        inputs = self.get_input_batch(board, locs, who)
+        hiddens = expit(inputs.dot(self.hidden_weights.T))
+        hiddens[:, 0] = 1.
+        return expit(hiddens.dot(self.output_weights.T)).ravel()
+
+    def get_input_batch(self, board, locs, who):
+        '''
+        Returns:
+        -----------
+        inputs : numpy.2darray
+            the input vector of the board after who places at each of locs, one per row
+        '''
+        v = board.stones
+        sz = v.shape[0]
+        iv = np.zeros((len(locs), sz * 2 + 3))
+        iv[:, 0] = 1.
+        iv[:, 1:sz + 1] = (v == Board.STONE_BLACK)
+        iv[:, sz + 1:sz * 2 + 1] = (v == Board.STONE_WHITE)
+        offset = 1 if who == Board.STONE_BLACK else sz + 1
+        iv[np.arange(len(locs)), offset + np.asarray(locs)] = 1.
+
+        black = board.counts[Board.STONE_BLACK] + (who == Board.STONE_BLACK)
+        white = board.counts[Board.STONE_WHITE] + (who == Board.STONE_WHITE)
+        turn = Board.STONE_BLACK if black == white else Board.STONE_WHITE
+        iv[:, -2] = 1 if turn == Board.STONE_BLACK else 0  # turn to black move
+        iv[:, -1] = 1 if turn == Board.STONE_WHITE else 0  # turn to white move
+        return iv
 
     def board_probabilities(self, board, context):
         inputs = self.get_input_values(board)
@@ -348,7 +418,7 @@ class StrategyHuman(Strategy):
             i, j = map(round, (pts[0, 0], pts[0, 1]))
             loc = int(i * Board.BOARD_SIZE + j)
             if old.stones[loc] == Board.STONE_EMPTY:
-                return [b for b in moves if b.stones[loc] != Board.STONE_EMPTY][0]
+                return moves.at(loc)
             else:
                 plt.title('invalid move')
                 continue
@@ -367,7 +437,7 @@ class StrategyNetBot(Strategy):
             i, j = 0, 0
             loc = int(i * Board.BOARD_SIZE + j)
             if old.stones[loc] == Board.STONE_EMPTY:
-                return [b for b in moves if b.stones[loc] != Board.STONE_EMPTY][0]
+                return moves.at(loc)
             else:
                 print('invalid move')
                 continue
@@ -382,6 +452,9 @@ class StrategyRand(Strategy):
     def preferred_board(self, old, moves, context):
         return random.choice(moves)
 
+    def preferred_loc(self, board, context):
+        return board.random_empty()
+
 
 class StrategyHeuristic(Strategy):
     def __init__(self):
@@ -392,13 +465,15 @@ class StrategyHeuristic(Strategy):
         find many space or many some color stones in surrounding
         '''
         game = context
+        loc = self.urgent_loc(old, game.whose_turn)
+        if loc is not None:
+            return moves.at(loc)
 
         offset = np.array([[-1, -1], [-1, 0], [-1, 1],
                  [0, -1], [0, 1],
                  [1, -1], [1, 0], [1, 1]], np.int)
-        loc = np.where(old.stones == 0)
         box = []
-        for i in loc[0]:
+        for i in old.candidates():
             row, col = divmod(i, Board.BOARD_SIZE)
             neighbors = offset + (row, col)
             s, space = 0, 0
@@ -416,28 +491,48 @@ class StrategyHeuristic(Strategy):
         if len(box) != 0:
             loc = box[0]
 #             print('place here(%d,%d), %d pals' % (loc[0], loc[1], loc[2]))
-            return [b for b in moves if b.stones[loc[0] * Board.BOARD_SIZE + loc[1]] != Board.STONE_EMPTY][0]
+            return moves.at(loc[0] * Board.BOARD_SIZE + loc[1])
         else:
             return random.choice(moves)
 
 
 class StrategyMinMax(Strategy):
-    def __init__(self):
+    '''
+    Parameters
+    ------------
+    max_depth : int
+        the deepest iteration of the search, the default 1 only looks one
+        move ahead, a deeper search is best bounded by time_budget
+    time_budget : float
+        seconds per move, the deepest iteration finished in time is played,
+        None to always search to max_depth
+    workers : int
+        processes splitting the moves at the root, 1 searches in this process
+    '''
+
+    def __init__(self, max_depth=1, time_budget=None, workers=1):
         super().__init__()
-        self.searcher = Searcher()
+        self.searcher = Searcher() if workers == 1 else ParallelSearcher(workers)
+        self.solver = ThreatSolver()
+        self.max_depth = max_depth
+        self.time_budget = time_budget
 
     def preferred_board(self, old, moves, context):
         game = context
-        self.searcher.board = old.stones.reshape((-1, Board.BOARD_SIZE)).tolist()
-        DEPTH = 1
-        score, row, col = self.searcher.search(game.whose_turn, DEPTH)
+        return old.child(self.preferred_loc(old, context), game.whose_turn)
+
+    def preferred_loc(self, board, context):
+        game = context
+        win = self.solver.solve(board, game.whose_turn)
+        if win is not None:
+            return win
+        self.searcher.board = board.copy()
+        score, row, col = self.searcher.search(game.whose_turn, self.max_depth, self.time_budget)
 #         print('score%d, loc(%d, %d)'%(score, row, col))
+        return row * Board.BOARD_SIZE + col
 
-        x = old.stones.copy()
-        x[row * Board.BOARD_SIZE + col] = game.whose_turn
-        b = Board()
-        b.stones = x
-        return b
+    def close(self):
+        self.searcher.close()
 
 
 class Auditor(object):
@@ -479,18 +574,44 @@ class StrategyMC(Strategy, Auditor):
 
     def load(self, file):
         with open(file, 'rb') as f:
-            self.mc.net = pickle.load(f)
+            net = pickle.load(f)
+        # nets saved before the numpy engine are pybrain networks
+        self.mc.net = net if isinstance(net, MLP) else MLP.from_pybrain(net)
         print('load OK')
 
 
 class StrategyMCTS1(Strategy, Auditor):
+    '''
+    Parameters
+    ------------
+    workers : int
+        processes searching in parallel from the root, each loads its own
+        model, 1 searches in this process
+    time_budget : float
+        seconds per move, None for a fixed number of simulations
+    transpositions : bool
+        share the nodes of positions reached by different move orders
+    batch_size : int
+        leaves evaluated by the model in one call, 1 evaluates them one by one
+    virtual_loss : float
+        visits counted as lost on a path while its leaf waits in a batch
+    '''
 
-    def __init__(self):
+    def __init__(self, workers=1, time_budget=None, transpositions=False, batch_size=8, virtual_loss=3):
         super().__init__()
+        self.last_state = None
+        if workers > 1:
+            self.brain = None
+            self.mcts = RootParallelMCTS(partial(_worker_mcts, time_budget, transpositions, batch_size, virtual_loss),
+                                         workers)
+            return
         self.brain = DCNN3(False, True, False)
         self.brain.run()
-        self.mcts = MCTS1(self._value_fn, self._policy_fn, self._rollout_fn)
-        self.last_state = None
+        n_playout = 400 if time_budget is None else None
+        search = TranspositionMCTS if transpositions else MCTS1
+        self.mcts = search(self._value_fn, self._policy_fn, self._rollout_fn, n_playout=n_playout,
+                           time_budget=time_budget, batch_fn=self._batch_fn if batch_size > 1 else None,
+                           batch_size=batch_size, virtual_loss=virtual_loss)
 
     def preferred_board(self, old, moves, context):
         if not moves:
@@ -501,14 +622,17 @@ class StrategyMCTS1(Strategy, Auditor):
             self.mcts.update_with_move(oppo_action)
 
         best_move = self.mcts.get_move(old)
-        v = old.stones
-        if v[best_move] == Board.STONE_EMPTY:
-            for m in moves:
-                if m.stones[best_move] != Board.STONE_EMPTY:
-                    self.last_state = m
-                    self.mcts.update_with_move(best_move)
-                    return m
-        raise Exception('impossible')
+        m = moves.at(best_move)
+        self.last_state = m
+        self.mcts.update_with_move(best_move)
+        return m
+
+    def close(self):
+        '''stop the worker processes, or free the model of this process'''
+        if self.brain is None:
+            self.mcts.close()
+        else:
+            self.brain.close()
 
     def _value_fn(self, board):
         state, _ = self.get_input_values(board.stones)
@@ -516,11 +640,13 @@ class StrategyMCTS1(Strategy, Auditor):
         return v
 
     def _policy_fn(self, board):
-        _, _, legal_moves = Game.possible_moves(board)
         state, _ = self.get_input_values(board.stones)
         probs = self.brain.get_move_probs(state)
-        probs = probs[0, legal_moves]
-        return list(zip(legal_moves, probs))
+        return probs[0]
+
+    def _batch_fn(self, stones):
+        states, _ = self.brain.adapt_state_batch(stones)
+        return self.brain.get_move_probs_and_values(states)
 
     def _rollout_fn(self, board, legal_moves):
         state, _ = self.get_input_values(board.stones)
@@ -532,7 +658,18 @@ class StrategyMCTS1(Strategy, Auditor):
         legal = (board == Board.STONE_EMPTY)
         return state, legal
 
+
+def _worker_mcts(time_budget, transpositions, batch_size, virtual_loss):
+    '''the search of one root parallel worker, noisy at the root so the workers differ'''
+    mcts = StrategyMCTS1(time_budget=time_budget, transpositions=transpositions, batch_size=batch_size,
+                         virtual_loss=virtual_loss).mcts
+    mcts.root_noise = 0.25
+    return mcts
+
 if __name__ == '__main__':
     mcts = StrategyMCTS1()
     board = Board()
-    mcts.preferred_board(board, None, None)
+    try:
+        mcts.preferred_board(board, None, None)
+    finally:
+        mcts.close()
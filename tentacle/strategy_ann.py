@@ -5,6 +5,7 @@ from pybrain.supervised.trainers.backprop import BackpropTrainer
 from pybrain.tools.shortcuts import buildNetwork
 
 import numpy as np
+from scipy.special import expit
 from tentacle.board import Board
 from tentacle.game import Game
 from tentacle.strategy import Strategy
@@ -96,16 +97,61 @@ class StrategyANN(Strategy):
         return self.net_attack.activate(iv), self.net_defence.activate(iv)
     
     def _decide_move(self, moves):
-        best_move_a, best_av = None, None
-        best_move_d, best_dv = None, None
-        for m in moves:
-            iv = self.get_input_values(m)
-            av, dv = self.net_attack.activate(iv), self.net_defence.activate(iv)
-            if best_av is None or best_av < av:
-                best_move_a, best_av = m, av
-            if best_dv is None or best_dv < dv:
-                best_move_d, best_dv = m, dv
-        return best_move_a if best_av >= best_dv else best_move_d
+        parent = self.get_input_values(moves.board)
+        av = self.child_values(self.net_attack, parent, moves)
+        dv = self.child_values(self.net_defence, parent, moves)
+        a, d = np.argmax(av), np.argmax(dv)
+        return moves[a] if av[a] >= dv[d] else moves[d]
+
+    @staticmethod
+    def child_values(net, parent, moves):
+        '''
+        evaluate net on the board after every move of moves. A child input
+        differs from the parent input by its stone and the turn bits, so the
+        first layer of every child is the parent's accumulator plus two
+        weight columns, and only the smaller layers after it are computed
+        per move
+
+        Parameters
+        ------------
+        net : pybrain network
+            from buildNetwork(features_num, hidden, hidden, 1, bias=True)
+        parent : 1d array
+            get_input_values of moves.board
+
+        Returns:
+        ------------
+        values : 1d array
+            one value per move
+        '''
+        w1, b1, w2, b2, w3, b3 = StrategyANN._layers(net)
+        sz = Board.BOARD_SIZE_SQ
+        acc = w1.dot(parent) + b1
+
+        offset = 0 if moves.who == Board.STONE_BLACK else sz
+        # the turn bit of the mover goes off and the other one on
+        mover, other = (-2, -1) if moves.who == Board.STONE_BLACK else (-1, -2)
+        acc += w1[:, other] - w1[:, mover]
+
+        hidden0 = expit(acc + w1[:, offset + moves.locs].T)
+        hidden1 = expit(hidden0.dot(w2.T) + b2)
+        return (hidden1.dot(w3.T) + b3).ravel()
+
+    @staticmethod
+    def _layers(net):
+        '''
+        Returns:
+        ------------
+        weights and biases of the three layers, as views of the net's
+        parameters that follow its training
+        '''
+        def params(src, dst):
+            conn = [c for c in net.connections[net[src]] if c.outmod is net[dst]][0]
+            return conn.params.reshape((conn.outdim, conn.indim))
+
+        return (params('in', 'hidden0'), params('bias', 'hidden0')[:, 0],
+                params('hidden0', 'hidden1'), params('bias', 'hidden1')[:, 0],
+                params('hidden1', 'out'), params('bias', 'out')[:, 0])
             
 
     def preferred_board(self, old, moves, context):
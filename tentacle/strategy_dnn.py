@@ -6,6 +6,7 @@ from tentacle.dnn import Pre
 from tentacle.dnn2 import DCNN2
 from tentacle.dnn3 import DCNN3
 from tentacle.strategy import Strategy, Auditor
+from tentacle.threat_space import ThreatSolver
 from builtins import (super)
 
 
@@ -20,6 +21,7 @@ class StrategyDNN(Strategy, Auditor):
 
         self.brain = DCNN3(is_train, is_revive, is_rl)
         self.brain.run()
+        self.solver = ThreatSolver()
 
     def update_at_end(self, old, new):
         if not self.needs_update():
@@ -35,17 +37,20 @@ class StrategyDNN(Strategy, Auditor):
         pass
 
     def preferred_move(self, board):
-        v = board.stones
-
-        state, legal = self.get_input_values(v)
-        probs = self.brain.get_move_probs(state)
+        who = self.stand_for if self.stand_for is not None else board.whose_turn()
+        win = self.solver.solve(board, who)
+        if win is not None:
+            return np.unravel_index(win, (Board.BOARD_SIZE, Board.BOARD_SIZE))
 
         if np.random.rand() < (self.exploration if self.brain.is_rl else self.final_exp):
-            rand_loc = np.random.choice(np.where(v == Board.STONE_EMPTY)[0], 1)[0]
+            rand_loc = board.random_empty()
             loc = np.unravel_index(rand_loc, (Board.BOARD_SIZE, Board.BOARD_SIZE))
 #             print('explore at:', loc)
             return loc
         else:
+            state, legal = self.get_input_values(board.stones)
+            probs = self.brain.get_move_probs(state)
+
             best_move = np.argmax(probs, 1)[0]
 #             if self.brain.is_rl:
 #                 best_move = np.argmax(np.random.multinomial(1, probs[0] - np.finfo(np.float32).epsneg))
@@ -54,24 +59,21 @@ class StrategyDNN(Strategy, Auditor):
             is_legal = board.is_legal(loc[0], loc[1])
             if not is_legal:
 #                 print('best move:', best_move, ', loc:', loc, 'is legal:', is_legal)
-                rand_loc = np.random.choice(np.where(v == Board.STONE_EMPTY)[0], 1)[0]
+                rand_loc = board.random_empty()
                 loc = np.unravel_index(rand_loc, (Board.BOARD_SIZE, Board.BOARD_SIZE))
 #                 print(self.stand_for,' get illegal, random choice:', loc)
 
             return loc
 
+    def preferred_loc(self, board, context):
+        loc = self.preferred_move(board)
+        return np.ravel_multi_index(loc, (Board.BOARD_SIZE, Board.BOARD_SIZE))
+
     def preferred_board(self, old, moves, context):
         if not moves:
             raise Exception('should be ended')
 
-        loc = self.preferred_move(old)
-        best_move = np.ravel_multi_index(loc, (Board.BOARD_SIZE, Board.BOARD_SIZE))
-        v = old.stones
-        if v[best_move] == Board.STONE_EMPTY:
-            for m in moves:
-                if m.stones[best_move] != Board.STONE_EMPTY:
-                    return m
-        raise Exception('impossible')
+        return moves.at(self.preferred_loc(old, context))
 
     def get_input_values(self, board):
         state, _ = self.brain.adapt_state(board)
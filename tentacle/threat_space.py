@@ -0,0 +1,159 @@
+from tentacle.board import Board
+
+
+class ThreatSolver(object):
+    '''
+    threat-space search for a forced win: the attacker plays only moves making
+    a four (VCF), or also moves making a three (VCT), and the defender answers
+    only by blocking the attacker's threats or by fours of its own.
+
+    A four leaves the defender at most one block, so VCF proofs are exact.
+    Against a three the defender is limited to the cells where the attacker
+    would make a four next and to its own fours, which is how threat-space
+    search keeps the tree small, and proofs found with threes are trusted on
+    that ground.
+
+    Attributes:
+    ------------------
+    vcf_depth : int
+        most attacker moves in a continuous-four sequence
+    vct_depth : int
+        most attacker moves in a sequence of fours and threes, 0 to skip VCT
+    max_nodes : int
+        positions visited per call of solve, the search gives up beyond it
+    cache : dict
+        (board size, hash, attacker, with threes) -> (depth, winning move or None),
+        shared by the calls of solve
+    cache_size : int
+        the cache is cleared when it holds this many positions
+    '''
+
+    def __init__(self, vcf_depth=12, vct_depth=4, max_nodes=2000, cache_size=1 << 16):
+        self.vcf_depth = vcf_depth
+        self.vct_depth = vct_depth
+        self.max_nodes = max_nodes
+        self.cache = {}
+        self.cache_size = cache_size
+        self.nodes = 0
+        self.exhausted = False
+
+    def solve(self, board, who):
+        '''
+        Parameters
+        ------------
+        board : Board
+            not changed
+        who : int
+            the side to move, the attacker
+
+        Returns:
+        ------------
+        loc : int
+            the first move of a forced win for who, None if none was found
+        '''
+        board = board.copy()
+        self.nodes = 0
+        self.exhausted = False
+        loc = self._attack(board, who, self.vcf_depth, False)
+        if loc is None and self.vct_depth > 0 and not self.exhausted:
+            loc = self._attack(board, who, self.vct_depth, True)
+        return loc
+
+    def vcf(self, board, who):
+        '''the first move of a win by continuous fours, None if none was found'''
+        board = board.copy()
+        self.nodes = 0
+        self.exhausted = False
+        return self._attack(board, who, self.vcf_depth, False)
+
+    def _attack(self, board, who, depth, threes):
+        '''
+        Returns:
+        ------------
+        loc : int
+            a move of who after which every defence loses within depth - 1 more
+            attacker moves, None if there is none or the budget ran out
+        '''
+        wins = board.winning_moves(who)
+        if wins:
+            return wins[0]
+        if depth <= 0:
+            return None
+
+        key = (Board.BOARD_SIZE, board.hash, who, threes)
+        known = self.cache.get(key)
+        if known is not None:
+            d, loc = known
+            if loc is not None and d <= depth:
+                return loc
+            if loc is None and d >= depth:
+                return None
+
+        oppo = Board.oppo(who)
+        blocks = board.winning_moves(oppo)
+        if len(blocks) > 1:
+            return self._remember(key, depth, None)
+
+        fours = board.threat_moves(who, 3)
+        moves = sorted(fours, key=lambda loc: -fours[loc])
+        if threes:
+            made = board.threat_moves(who, 2)
+            moves += sorted((loc for loc in made if loc not in fours), key=lambda loc: -made[loc])
+        if blocks:  # the opponent has a four, only a block may go on with the attack
+            moves = [loc for loc in moves if loc == blocks[0]]
+
+        for loc in moves:
+            if self.nodes >= self.max_nodes:
+                self.exhausted = True
+                return None
+            self.nodes += 1
+            board.push(loc, who)
+            won = self._defend(board, oppo, who, depth - 1, threes)
+            board.pop()
+            if won:
+                return self._remember(key, depth, loc)
+            if self.exhausted:
+                return None
+        return self._remember(key, depth, None)
+
+    def _defend(self, board, who, attacker, depth, threes):
+        '''
+        Returns:
+        ------------
+        won : bool
+            True if the attacker wins against every reply of who considered
+        '''
+        if board.over:
+            return board.winner == attacker
+        if board.winning_moves(who):
+            return False
+
+        threats = board.winning_moves(attacker)
+        if len(threats) > 1:
+            return True
+        if threats:
+            replies = threats
+        else:
+            if not threes:
+                return False
+            fours = board.threat_moves(attacker, 3)
+            if not fours:
+                return False
+            replies = list(fours) + [loc for loc in board.threat_moves(who, 3) if loc not in fours]
+
+        for loc in replies:
+            self.nodes += 1
+            board.push(loc, who)
+            won = self._attack(board, attacker, depth, threes) is not None
+            board.pop()
+            if not won:
+                return False
+        return True
+
+    def _remember(self, key, depth, loc):
+        '''cache a proof, or a failure found without running out of budget'''
+        if loc is not None or not self.exhausted:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[key] = (depth, loc)
+        return loc
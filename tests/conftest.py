@@ -0,0 +1,11 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def table_cache(tmp_path_factory):
+    '''the lookup tables built by the tests go to a temporary directory, not to the user cache'''
+    os.environ['TENTACLE_CACHE'] = str(tmp_path_factory.mktemp('cache'))
+    yield
+    del os.environ['TENTACLE_CACHE']
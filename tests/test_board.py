@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+from tentacle.bitboard import BitBoard
+from tentacle.board import Board
+
+
+def random_board(moves, board_cls=Board):
+    '''a board after up to moves random moves, stopped before anyone makes five'''
+    b = board_cls()
+    for _ in range(moves):
+        loc = b.random_empty()
+        b.push(loc)
+        if b.over:
+            b.pop()
+            break
+    return b
+
+
+def has_five(stones, who):
+    grid = (stones.reshape(Board.BOARD_SIZE, Board.BOARD_SIZE) == who).astype(int)
+    for line in list(grid) + list(grid.T) + \
+            [np.diag(grid, d) for d in range(-Board.BOARD_SIZE + 1, Board.BOARD_SIZE)] + \
+            [np.diag(np.fliplr(grid), d) for d in range(-Board.BOARD_SIZE + 1, Board.BOARD_SIZE)]:
+        if np.any(np.convolve(line, np.ones(Board.WIN_STONE_NUM, int), 'valid') == Board.WIN_STONE_NUM):
+            return True
+    return False
+
+
+def snapshot(b):
+    return (b.stones.copy(), b.hash, b.canonical_hash, sorted(b.empties().tolist()), b.near_counts().copy(),
+            [sorted(b.winning_moves(c)) for c in (1, 2)], [b.threat_counts(c) for c in (1, 2)])
+
+
+def assert_same(a, b):
+    for x, y in zip(a, b):
+        if isinstance(x, np.ndarray):
+            assert np.array_equal(x, y)
+        else:
+            assert x == y
+
+
+@pytest.mark.parametrize('board_cls', [Board, BitBoard])
+def test_pop_restores_push(board_cls):
+    np.random.seed(0)
+    for _ in range(10):
+        b = random_board(np.random.randint(0, 60), board_cls)
+        before = snapshot(b)
+        pushed = 0
+        for _ in range(np.random.randint(1, 20)):
+            pushed += 1
+            if b.push(b.random_empty()):
+                break
+        for _ in range(pushed):
+            b.pop()
+        assert_same(before, snapshot(b))
+
+
+@pytest.mark.parametrize('board_cls', [Board, BitBoard])
+def test_incremental_threats_match_rebuilt(board_cls):
+    np.random.seed(1)
+    b = board_cls()
+    b.threat_counts(Board.STONE_BLACK)
+    for _ in range(120):
+        if b.push(b.random_empty()):
+            break
+        fresh = board_cls()
+        fresh.stones = b.stones.copy()
+        for who in (Board.STONE_BLACK, Board.STONE_WHITE):
+            assert b.threat_counts(who) == fresh.threat_counts(who)
+            assert sorted(b.winning_moves(who)) == sorted(fresh.winning_moves(who))
+
+
+def test_winning_moves_match_brute_force():
+    np.random.seed(2)
+    for _ in range(20):
+        b = random_board(np.random.randint(10, 90))
+        for who in (Board.STONE_BLACK, Board.STONE_WHITE):
+            expected = []
+            for loc in b.empties():
+                stones = b.stones.copy()
+                stones[loc] = who
+                if has_five(stones, who):
+                    expected.append(int(loc))
+            assert sorted(b.winning_moves(who)) == sorted(expected)
+
+
+@pytest.mark.parametrize('line, threes, fours', [
+    ('..XXX..', 1, 0),
+    ('.X.XX.', 1, 0),
+    ('..XXX.O', 1, 0),
+    ('.XXX.', 0, 0),
+    ('OXXX..', 0, 0),
+    ('.XXXX.', 0, 1),
+    ('OXXXX.', 0, 1),
+    ('X.XXX', 0, 1),
+    ('X.XXX.X', 0, 2),
+    ('..XXX.X..', 0, 1),
+])
+def test_line_shapes(line, threes, fours):
+    stones = np.array(['.XO'.index(c) for c in line])
+    t, f = Board.line_shapes(stones)
+    assert (t[Board.STONE_BLACK], f[Board.STONE_BLACK]) == (threes, fours)
+    assert (t[Board.STONE_WHITE], f[Board.STONE_WHITE]) == (0, 0)
+
+
+def test_bitboard_rejects_more_than_one_new_stone():
+    b = BitBoard()
+    b.move(3, 3, Board.STONE_BLACK)
+    old = b.copy()
+    b.move(4, 4, Board.STONE_WHITE)
+    b.move(5, 5, Board.STONE_BLACK)
+    with pytest.raises(Exception):
+        b.is_over(old)
+
+
+def test_bitboard_is_over_matches_board():
+    rng = np.random.RandomState(5)
+    for _ in range(20):
+        a, b = Board(), BitBoard()
+        who = Board.STONE_BLACK
+        for loc in rng.permutation(Board.BOARD_SIZE_SQ):
+            a1, b1 = a.child(loc, who), b.child(loc, who)
+            result = a1.is_over(a)
+            assert b1.is_over(b) == result
+            assert b1.winner == a1.winner
+            if result[0]:
+                break
+            a, b, who = a1, b1, Board.oppo(who)
+
+
+def dihedral(stones):
+    '''the 8 rotations and reflections of a position, built with plain numpy'''
+    grid = stones.reshape(Board.BOARD_SIZE, Board.BOARD_SIZE)
+    out = []
+    for k in range(4):
+        out.append(np.rot90(grid, k))
+        out.append(np.rot90(grid, k).T)
+    return [g.ravel() for g in out]
+
+
+@pytest.mark.parametrize('board_cls', [Board, BitBoard])
+def test_symmetric_positions_share_canonical_hash(board_cls):
+    np.random.seed(4)
+    for _ in range(5):
+        b = random_board(9, board_cls)
+        stones, h, t = b.canonical()
+        assert h == b.canonical_hash
+        variants = dihedral(b.stones)
+        assert len({v.tobytes() for v in variants}) == 8  # no symmetry of its own
+        for v in variants:
+            c = board_cls()
+            for loc in np.flatnonzero(v):
+                c.push(loc, v[loc])
+            assert c.canonical_hash == b.canonical_hash
+            assert np.array_equal(c.canonical()[0], stones)
+        batch_stones, batch_hashes, _ = Board.canonical_batch(np.array(variants))
+        assert (batch_hashes == b.canonical_hash).all()
+        assert (batch_stones == stones).all()
+        # a different position gets a different hash
+        b.push(b.random_empty())
+        assert b.canonical_hash != h
@@ -0,0 +1,47 @@
+import numpy as np
+
+from tentacle.board import Board
+from tentacle.board_batch import BoardBatch
+
+
+def test_play_and_winners_match_board():
+    np.random.seed(0)
+    n = 16
+    # moves kept to a small square in the centre, so most games end in a five
+    size, half = Board.BOARD_SIZE, Board.BOARD_SIZE // 2
+    area = np.array([r * size + c for r in range(half - 3, half + 3) for c in range(half - 3, half + 3)])
+    batch = BoardBatch(n)
+    boards = [Board() for _ in range(n)]
+    while not batch.done.all():
+        locs = np.zeros(n, int)
+        for i, b in enumerate(boards):
+            if not b.over:
+                free = area[b.stones[area] == Board.STONE_EMPTY]
+                locs[i] = np.random.choice(free) if free.size else b.random_empty()
+        was_over = [b.over for b in boards]
+        ended = batch.play(locs)
+        for i, b in enumerate(boards):
+            if not was_over[i]:
+                b.push(int(locs[i]))
+            assert ended[i] == (b.over and not was_over[i])
+            assert np.array_equal(batch.stones[i], b.stones)
+            assert batch.turn[i] == b.whose_turn() or b.over
+        winners = batch.winners()
+        assert [int(w) for w in winners] == [b.winner if b.over else Board.STONE_EMPTY for b in boards]
+    assert any(b.winner != Board.STONE_EMPTY for b in boards)
+
+
+def test_round_trip_through_boards():
+    np.random.seed(1)
+    boards = []
+    for _ in range(4):
+        b = Board()
+        for _ in range(np.random.randint(1, 30)):
+            if b.push(b.random_empty()):
+                b.pop()
+                break
+        boards.append(b)
+    batch = BoardBatch.from_boards(boards)
+    for i, b in enumerate(boards):
+        assert np.array_equal(batch.to_board(i).stones, b.stones)
+        assert batch.turn[i] == b.whose_turn()
@@ -0,0 +1,174 @@
+import os
+import time
+
+import numpy as np
+
+from tentacle.board import Board
+from tentacle.dfs import Eval, Searcher
+
+
+def full_counts(ev, board):
+    '''the shape counts of the original whole-board scan of Eval.test'''
+    ev.test(board)
+    counts = [[0] * 20 for _ in range(3)]
+    grid = board.stones.reshape(Board.BOARD_SIZE, Board.BOARD_SIZE)
+    for i, j in zip(*np.nonzero(grid)):
+        for k in range(4):
+            ch = ev.record[i][j][k]
+            if ch in ev.CHECK:
+                counts[grid[i, j]][ch] += 1
+    return counts
+
+
+def tracked_counts(ev):
+    return [[ev.totals[c][ch] if ch in ev.CHECK else 0 for ch in range(20)] for c in range(3)]
+
+
+def test_sync_matches_full_analysis():
+    np.random.seed(0)
+    ev, reference = Eval(), Eval()
+    for _ in range(30):
+        b = Board()
+        for _ in range(np.random.randint(1, 80)):
+            if b.push(b.random_empty()):
+                break
+        ev.sync(b)
+        assert tracked_counts(ev) == full_counts(reference, b)
+
+
+def test_make_unmake_match_full_analysis():
+    np.random.seed(1)
+    ev, reference = Eval(), Eval()
+    for _ in range(5):
+        b = Board()
+        ev.sync(b)
+        for _ in range(60):
+            loc, who = b.random_empty(), b.whose_turn()
+            b.push(loc, who)
+            ev.make(loc, who)
+            assert tracked_counts(ev) == full_counts(reference, b)
+            if b.over:
+                break
+        while b.history:
+            b.pop()
+            ev.unmake()
+            assert tracked_counts(ev) == full_counts(reference, b)
+
+
+def test_evaluate_same_while_tracking():
+    np.random.seed(2)
+    ev, fresh = Eval(), Eval()
+    b = Board()
+    ev.sync(b)
+    for _ in range(40):
+        loc, who = b.random_empty(), b.whose_turn()
+        b.push(loc, who)
+        ev.make(loc, who)
+        if b.over:
+            break
+        for turn in (Board.STONE_BLACK, Board.STONE_WHITE):
+            assert ev.evaluate(b, turn) == fresh.evaluate(b, turn)
+
+
+def vcf_position():
+    '''white to move wins by continuous fours starting at (8, 9)'''
+    b = Board()
+    for row, col, who in [(4, 4, 2), (4, 7, 1), (5, 5, 1), (5, 7, 1), (6, 4, 1), (6, 8, 2), (7, 9, 1), (7, 10, 2),
+                          (8, 6, 2), (8, 8, 2), (8, 10, 2), (9, 9, 1), (10, 6, 1), (10, 8, 2), (10, 9, 1)]:
+        b.move(row, col, who)
+    return b
+
+
+def negamax(searcher, turn, depth, ply=0):
+    '''plain fixed-depth negamax over the moves and evaluation of searcher'''
+    ev, board = searcher.evaluator, searcher.board
+    score = ev.evaluate(board, turn)
+    if depth <= 0 or (abs(score) >= 9999 and ply > 0):
+        return score
+    best = -0x7fffffff
+    for loc in searcher.genmove(turn):
+        board.push(loc, turn)
+        ev.make(loc, turn)
+        best = max(best, -negamax(searcher, Board.oppo(turn), depth - 1, ply + 1))
+        board.pop()
+        ev.unmake()
+    return best
+
+
+def test_genmove_is_every_empty_point_near_a_stone():
+    np.random.seed(1)
+    s = Searcher()
+    assert s.genmove(Board.STONE_BLACK) == [Board.BOARD_SIZE_SQ // 2]
+    r = Board.NEAR_RADIUS
+    for _ in range(12):
+        s.board.push(s.board.random_empty())
+        grid = s.board.stones.reshape(Board.BOARD_SIZE, Board.BOARD_SIZE)
+        expected = set()
+        for i, j in zip(*np.nonzero(grid == Board.STONE_EMPTY)):
+            if grid[max(0, i - r):i + r + 1, max(0, j - r):j + r + 1].any():
+                expected.add(i * Board.BOARD_SIZE + j)
+        moves = s.genmove(s.board.whose_turn())
+        assert len(moves) == len(expected) and set(moves) == expected
+        near = s.board.near_counts()
+        assert all(near[a] >= near[b] for a, b in zip(moves, moves[1:]))
+
+
+def test_search_plays_the_win_found_deeper():
+    s = Searcher()
+    s.board = vcf_position()
+    shallow = s.search(Board.STONE_WHITE, 1)
+    score, row, col = s.search(Board.STONE_WHITE, 3)
+    assert score > 8000
+    assert (row, col) == (8, 9)
+    assert (row, col) != shallow[1:]
+
+
+def test_deepening_with_table_matches_negamax():
+    np.random.seed(3)
+    checked = 0
+    while checked < 3:
+        b = Board()
+        for _ in range(np.random.randint(4, 10)):
+            if b.push(int(np.random.choice(np.flatnonzero((Board.centre_distance() <= 2) & (b.stones == 0))))):
+                b.pop()
+                break
+        turn = b.whose_turn()
+        s = Searcher()
+        s.board = b
+        score, _, _ = s.search(turn, 2)
+        if abs(score) > 8000:  # decided at the first iteration, nothing to deepen
+            continue
+        checked += 1
+        assert s.depth_reached == 2
+        assert len(s.tt) > 0
+        # a second search starts from a filled table and must agree
+        assert s.search(turn, 2)[0] == score
+
+        ref = Searcher()
+        ref.board = b.copy()
+        ref.evaluator.sync(ref.board)
+        assert negamax(ref, turn, 2) == score
+
+
+def test_time_budget_stops_deepening():
+    s = Searcher()
+    b = vcf_position()
+    b.pop()  # no forced win left, so the search would go on deepening
+    s.board = b
+    begin = time.time()
+    score, row, col = s.search(Board.STONE_WHITE, 10, time_budget=0.3)
+    assert time.time() - begin < 5
+    assert 1 <= s.depth_reached < 10
+    assert b.stones[row * Board.BOARD_SIZE + col] == Board.STONE_EMPTY
+
+
+def test_line_table_goes_to_the_given_file(tmp_path):
+    Eval._table = None
+    Eval._memo.clear()
+    path = tmp_path / 'table.npy'
+    ev = Eval(table_file=str(path))
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    ev.sync(b)
+    assert path.exists()
+    assert Eval.table_path().startswith(os.environ['TENTACLE_CACHE'])
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from tentacle.board import Board
+from tentacle.game import Game
+
+
+def old_possible_moves(board):
+    '''the list of boards possible_moves used to build'''
+    who = Game.whose_turn_now(board)
+    return [board.child(i, who) for i in np.where(board.stones == 0)[0]]
+
+
+def test_move_list_matches_list_of_boards():
+    np.random.seed(2)
+    b = Board()
+    for _ in range(7):
+        b.push(b.random_empty())
+    moves, who, locs = Game.possible_moves(b)
+    boards = old_possible_moves(b)
+
+    assert len(moves) == len(boards) == locs.size
+    assert who == b.whose_turn()
+    for i in (0, 1, len(boards) // 2, -1):
+        assert np.array_equal(moves[i].stones, boards[i].stones)
+    assert [m.stones.tolist() for m in moves[2:5]] == [m.stones.tolist() for m in boards[2:5]]
+    for m, old, loc in zip(moves, boards, locs):
+        assert np.array_equal(m.stones, old.stones)
+        assert np.array_equal(moves.at(loc).stones, old.stones)
+        assert m.hash == old.hash
+
+
+def test_move_list_at_occupied_raises():
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    moves, _, _ = Game.possible_moves(b)
+    with pytest.raises(Exception):
+        moves.at(Board.BOARD_SIZE_SQ // 2)
+    # building the children leaves the board alone
+    assert b.move_count == 1
@@ -0,0 +1,199 @@
+import numpy as np
+import pytest
+
+from tentacle.board import Board
+from tentacle.mcts1 import MCTS1, NodeArena, TranspositionMCTS
+
+
+def central_policy(board):
+    '''a prior that prefers the centre, so the tree grows deep enough to reroot'''
+    return np.exp(-2. * Board.centre_distance())
+
+
+def no_value(board):
+    return 0.
+
+
+def reachable_rows(tree, root):
+    return set(np.flatnonzero(tree.reachable(root)).tolist())
+
+
+def test_reroot_keeps_the_subtree():
+    np.random.seed(0)
+    m = MCTS1(no_value, central_policy, n_playout=400)
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    m.search(b)
+
+    tree = m.tree
+    loc = int(np.argmax(tree.N[m.root]))
+    child = int(tree.child[m.root, loc])
+    reply = int(np.argmax(tree.N[child]))
+    grandchild = int(tree.child[child, reply])
+    assert grandchild >= 0
+    kept = tree.N[grandchild].sum()
+
+    # searching the grandchild position continues from its node without update_with_move
+    b.push(loc)
+    b.push(reply)
+    visits = m.search(b)
+    assert m.root == grandchild
+    assert visits.sum() == kept + 400
+    assert set(np.flatnonzero(tree.used).tolist()) == reachable_rows(tree, m.root)
+
+
+def test_update_with_move_frees_the_rest():
+    np.random.seed(1)
+    m = MCTS1(no_value, central_policy, n_playout=200)
+    b = Board()
+    m.search(b)
+    loc = int(np.argmax(m.tree.N[m.root]))
+    child = int(m.tree.child[m.root, loc])
+    m.update_with_move(loc)
+    assert m.root == child
+    assert m.tree.parent[child] == -1
+    assert len(m.tree) == len(reachable_rows(m.tree, child))
+
+
+def test_unrelated_position_drops_the_tree():
+    m = MCTS1(no_value, central_policy, n_playout=100)
+    b = Board()
+    b.push(0)
+    m.search(b)
+    other = Board()
+    other.push(Board.BOARD_SIZE_SQ - 1)
+    visits = m.search(other)
+    assert visits.sum() == 100
+    assert len(m.tree) == len(reachable_rows(m.tree, m.root))
+
+
+def test_arena_eviction_stays_in_capacity():
+    np.random.seed(2)
+    capacity = 32
+    m = MCTS1(no_value, central_policy, n_playout=600, capacity=capacity)
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    visits = m.search(b)
+    tree = m.tree
+    # evicted leaves keep their visits on the edges of their parents
+    assert visits.sum() == 600
+    assert len(tree) <= capacity
+    assert tree.used[m.root]
+    for i in np.flatnonzero(tree.used):
+        if i != m.root:
+            assert tree.child[tree.parent[i], tree.parent_loc[i]] == i
+    assert set(np.flatnonzero(tree.used).tolist()) == reachable_rows(tree, m.root)
+
+
+def chain(arena, length):
+    '''a root with a single line of descendants, only the last one is a leaf'''
+    width = Board.BOARD_SIZE_SQ
+    prior = np.full(width, 1. / width, np.float32)
+    rows = [arena.alloc(prior, 0)]
+    for loc in range(length - 1):
+        rows.append(arena.alloc(prior, loc + 1, rows[-1], loc))
+    return rows
+
+
+def test_reserve_evicts_bottom_up():
+    arena = NodeArena(4)
+    root, a, b, c = chain(arena, 4)
+    arena.reserve(2, root)
+    assert len(arena.free) >= 2
+    assert arena.used[root] and arena.used[a]
+    assert not arena.used[b] and not arena.used[c]
+    arena.alloc(arena.P[root], 9, a, 5)
+    arena.alloc(arena.P[root], 10, a, 6)
+
+
+def test_reserve_beyond_capacity_raises():
+    arena = NodeArena(4)
+    root = chain(arena, 4)[0]
+    with pytest.raises(Exception, match='arena full'):
+        arena.reserve(4, root)
+
+
+def test_tiny_arena_search():
+    np.random.seed(3)
+    m = MCTS1(no_value, central_policy, n_playout=200, capacity=3)
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    assert m.search(b).sum() == 200
+    assert len(m.tree) <= 3
+
+
+class CountingBatch(object):
+    '''batch_fn with the central prior and no value, counting its calls'''
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, stones):
+        self.calls += 1
+        prior = np.exp(-2. * Board.centre_distance())
+        return np.tile(prior, (len(stones), 1)), np.zeros(len(stones))
+
+
+def test_batched_search_keeps_visit_totals():
+    np.random.seed(4)
+    batch = CountingBatch()
+    m = MCTS1(no_value, central_policy, n_playout=96, batch_fn=batch, batch_size=8, virtual_loss=3)
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    visits = m.search(b)
+    assert visits.sum() == 96
+    assert batch.calls == m.stats['evals'] == 12
+
+
+def test_virtual_loss_is_reverted():
+    np.random.seed(5)
+    m = MCTS1(no_value, central_policy, n_playout=64, batch_fn=CountingBatch(), batch_size=8, virtual_loss=3)
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    m.search(b)
+    tree = m.tree
+    used = tree.used
+    # every value is zero, anything left on W or a fraction on N would be virtual loss
+    assert not tree.W[used].any()
+    assert np.array_equal(tree.N[used], np.round(tree.N[used]))
+    for i in np.flatnonzero(used):
+        if i != m.root:
+            # one visit expanded the child, the rest went through it
+            assert tree.N[tree.parent[i], tree.parent_loc[i]] == tree.N[i].sum() + 1
+
+
+def policy_on(cells):
+    def policy(board):
+        p = np.full(Board.BOARD_SIZE_SQ, 1e-6)
+        p[cells] = 1.
+        return p
+    return policy
+
+
+def test_transpositions_share_one_node():
+    np.random.seed(6)
+    centre = Board.BOARD_SIZE_SQ // 2
+    a, c, d = centre - 1, centre + 1, centre + Board.BOARD_SIZE
+    m = TranspositionMCTS(no_value, policy_on([a, c, d]), n_playout=200)
+    b = Board()
+    b.push(centre)
+    m.search(b)
+    # white a, black c, white d reaches the same position as white d, black c, white a
+    tree = m.tree
+    via_a = tree.child[tree.child[tree.child[m.root, a], c], d]
+    via_d = tree.child[tree.child[tree.child[m.root, d], c], a]
+    assert via_a >= 0 and via_a == via_d
+    for loc in (a, c, d):
+        b.push(loc)
+    assert tree.table[b.hash] == via_a
+
+
+def test_transposition_arena_stays_in_capacity():
+    np.random.seed(7)
+    m = TranspositionMCTS(no_value, central_policy, n_playout=300, capacity=16)
+    b = Board()
+    b.push(Board.BOARD_SIZE_SQ // 2)
+    assert m.search(b).sum() == 300
+    tree = m.tree
+    assert len(tree) <= 16
+    assert all(tree.used[row] and tree.hash[row] == h for h, row in tree.table.items())
@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+import pytest
+
+from tentacle.mlp import MLP
+
+
+def sigmoid(x):
+    return 1. / (1. + math.exp(-x))
+
+
+def loop_activate(mlp, x):
+    '''one sample through the net with plain python loops'''
+    hidden = [sigmoid(sum(w * v for w, v in zip(row, x)) + b)
+              for row, b in zip(mlp.hidden_weights, mlp.hidden_bias)]
+    return [sigmoid(sum(w * h for w, h in zip(row, hidden)) + b)
+            for row, b in zip(mlp.output_weights, mlp.output_bias)]
+
+
+class Module(object):
+    def __init__(self, name, indim):
+        self.name = name
+        self.indim = indim
+
+
+class Connection(object):
+    def __init__(self, inmod, outmod, params):
+        self.inmod, self.outmod = inmod, outmod
+        self.indim, self.outdim = inmod.indim, outmod.indim
+        self.params = np.asarray(params, float).ravel()
+
+
+class FakeNetwork(object):
+    '''the parts of a pybrain buildNetwork(2, 3, 1, bias=True) that from_pybrain reads'''
+    def __init__(self):
+        mods = {'in': Module('in', 2), 'hidden0': Module('hidden0', 3),
+                'out': Module('out', 1), 'bias': Module('bias', 1)}
+        self.mods = mods
+        # pybrain keeps FullConnection params row by row over (outdim, indim)
+        self.connections = {
+            mods['in']: [Connection(mods['in'], mods['hidden0'], [[.5, -1.], [2., .25], [-.75, 1.5]])],
+            mods['bias']: [Connection(mods['bias'], mods['hidden0'], [[.1], [-.2], [.3]]),
+                           Connection(mods['bias'], mods['out'], [[-.4]])],
+            mods['hidden0']: [Connection(mods['hidden0'], mods['out'], [[1., -2., .5]])],
+            mods['out']: [],
+        }
+
+    def __getitem__(self, name):
+        return self.mods[name]
+
+
+def test_batch_matches_each_sample():
+    np.random.seed(0)
+    mlp = MLP(6, 5, 2)
+    inputs = np.random.rand(7, 6)
+    outputs = mlp.activate_batch(inputs)
+    assert outputs.shape == (7, 2)
+    for x, y in zip(inputs, outputs):
+        assert np.allclose(mlp.activate(x), y)
+        assert np.allclose(loop_activate(mlp, x), y)
+
+
+def test_from_pybrain_layout():
+    mlp = MLP.from_pybrain(FakeNetwork())
+    assert mlp.hidden_weights.shape == (3, 2)
+    x = [.3, -.6]
+    hidden = [sigmoid(.5 * .3 - 1. * -.6 + .1),
+              sigmoid(2. * .3 + .25 * -.6 - .2),
+              sigmoid(-.75 * .3 + 1.5 * -.6 + .3)]
+    out = sigmoid(hidden[0] - 2. * hidden[1] + .5 * hidden[2] - .4)
+    assert np.allclose(mlp.activate(np.array(x)), [out])
+
+
+def test_from_pybrain_matches_activate():
+    shortcuts = pytest.importorskip('pybrain.tools.shortcuts')
+    structure = pytest.importorskip('pybrain.structure')
+    net = shortcuts.buildNetwork(4, 3, 2, bias=True, outclass=structure.SigmoidLayer)
+    net._setParameters(np.linspace(-1., 1., len(net.params)))
+    mlp = MLP.from_pybrain(net)
+    for x in np.random.RandomState(0).rand(5, 4):
+        assert np.allclose(mlp.activate(x), net.activate(x))
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from tentacle.board import Board
+from tentacle.dfs import ParallelSearcher, Searcher, SharedTable
+from tentacle.game import play_games
+from tentacle.strategy import StrategyRand
+from test_dfs import vcf_position
+
+
+def positions(n, seed):
+    np.random.seed(seed)
+    boards = []
+    while len(boards) < n:
+        b = Board()
+        for _ in range(np.random.randint(2, 10)):
+            if b.push(int(np.random.choice(np.flatnonzero((Board.centre_distance() <= 3) & (b.stones == 0))))):
+                b.pop()
+                break
+        boards.append(b)
+    return boards
+
+
+@pytest.mark.parametrize('shared_tt', [False, True])
+def test_parallel_search_matches_searcher(shared_tt):
+    searcher = ParallelSearcher(2, shared_tt=shared_tt, tt_slots=1 << 16)
+    try:
+        # moves of equal score may be told apart differently, these positions have one best move
+        for b in positions(4, 5):
+            turn = b.whose_turn()
+            for depth in (1, 2):
+                s = Searcher()
+                s.board = b.copy()
+                searcher.board = b.copy()
+                assert searcher.search(turn, depth) == s.search(turn, depth)
+
+        s = Searcher()
+        s.board = vcf_position()
+        searcher.board = vcf_position()
+        assert searcher.search(Board.STONE_WHITE, 3) == s.search(Board.STONE_WHITE, 3)
+    finally:
+        searcher.close()
+
+
+def test_shared_table_round_trip():
+    table = SharedTable(64)
+    key = (1 << 63) + 12345
+    assert table.get(key) is None
+    table[key] = (3, Searcher.LOWER, -9999, 112)
+    assert table.get(key) == (3, Searcher.LOWER, -9999, 112)
+    table[7] = (1, Searcher.EXACT, 42, None)
+    assert table.get(7) == (1, Searcher.EXACT, 42, None)
+    # another key in the same slot overwrites it, the old key then misses
+    table[7 + 64] = (2, Searcher.UPPER, 5, 0)
+    assert table.get(7) is None
+    assert table.get(7 + 64) == (2, Searcher.UPPER, 5, 0)
+
+
+def test_shared_table_torn_slot_reads_as_miss():
+    table = SharedTable(64)
+    table[9] = (4, Searcher.EXACT, 100, 3)
+    table.view()[2 * 9 + 1] += 1  # the data word of another writer
+    assert table.get(9) is None
+
+
+def random_pair():
+    s1, s2 = StrategyRand(), StrategyRand()
+    s1.stand_for, s2.stand_for = Board.STONE_BLACK, Board.STONE_WHITE
+    return s1, s2
+
+
+def test_play_games_replays_to_the_reported_winner():
+    games = list(play_games(random_pair, 4, workers=2))
+    assert len(games) == 4
+    for moves, winner, steps, _ in games:
+        assert steps == len(moves)
+        b = Board()
+        for who, loc in moves:
+            assert not b.over
+            b.push(loc, who)
+        assert b.over and b.winner == winner
@@ -0,0 +1,38 @@
+import numpy as np
+
+from tentacle.board import Board
+from tentacle.mcts1 import MCTS1, RootParallelMCTS
+from tentacle.strategy import StrategyMCTS1
+
+
+def uniform(board):
+    return np.ones(Board.BOARD_SIZE_SQ)
+
+
+def make_engine():
+    return MCTS1(lambda board: 0., uniform, n_playout=30, root_noise=0.25)
+
+
+def test_every_worker_searches_once():
+    search = RootParallelMCTS(make_engine, 3)
+    try:
+        b = Board()
+        b.push(Board.BOARD_SIZE_SQ // 2)
+        first = search.search(b)
+        assert first.sum() == 3 * 30
+        # the workers keep their trees, so the same position adds one search each
+        assert search.search(b).sum() == 2 * 3 * 30
+        assert first[Board.BOARD_SIZE_SQ // 2] == 0
+    finally:
+        search.close()
+    assert search.procs == []
+
+
+def test_strategy_close_stops_the_workers():
+    s = StrategyMCTS1.__new__(StrategyMCTS1)  # skips loading a model, the workers use make_engine
+    s.brain = None
+    s.mcts = RootParallelMCTS(make_engine, 2)
+    procs = list(s.mcts.procs)
+    assert all(p.is_alive() for p in procs)
+    s.close()
+    assert not any(p.is_alive() for p in procs)
@@ -0,0 +1,75 @@
+import numpy as np
+
+from tentacle.board import Board
+from tentacle.selfplay import SelfPlay
+
+
+class StubBrain(object):
+    is_rl = False
+
+    def adapt_state_batch(self, stones):
+        return stones.astype(float), stones == Board.STONE_EMPTY
+
+    def get_move_probs(self, state):
+        return np.random.rand(*state.shape)
+
+
+class StubStrategy(object):
+    '''the part of StrategyDNN that SelfPlay uses, remembers what it is fed'''
+    def __init__(self):
+        self.brain = StubBrain()
+        self.exploration = 0.
+        self.final_exp = 0.
+        self.stand_for = None
+        self.games = []
+
+    def on_episode_start(self):
+        self.games.append({'side': self.stand_for, 'moves': [], 'absorbed': None})
+
+    def swallow(self, who, st0, st1, **kwargs):
+        self.games[-1]['moves'].append((who, st0, st1))
+
+    def absorb(self, winner, **kwargs):
+        self.games[-1]['absorbed'] = winner
+
+
+def drawn_position():
+    '''a full board but the first point, where no line of five can be made'''
+    n = Board.BOARD_SIZE
+    r, c = np.indices((n, n))
+    stones = np.where((r // 2 + c) % 2 == 0, Board.STONE_BLACK, Board.STONE_WHITE).ravel()
+    stones[0] = Board.STONE_EMPTY
+    b = Board()
+    b.stones = stones
+    return b
+
+
+def test_outcomes_match_the_games_fed():
+    np.random.seed(3)
+    learner, opponent = StubStrategy(), StubStrategy()
+    wins, losses, draws = SelfPlay(learner, opponent, parallel=3, start_position=Board).run(5)
+    assert wins + losses + draws == 5
+    assert len(learner.games) == 5
+
+    won = lost = 0
+    for g in learner.games:
+        who, old, last = g['moves'][-1]
+        over, winner, _ = last.is_over(old)
+        assert over
+        # like Game, the side that made the last move is absorbed
+        assert g['absorbed'] == who
+        won += winner == g['side']
+        lost += winner == Board.oppo(g['side'])
+        for (_, _, st1), (_, st0, _) in zip(g['moves'], g['moves'][1:]):
+            assert st0 is st1
+    assert (won, lost) == (wins, losses)
+    assert opponent.games == []
+
+
+def test_a_draw_absorbs_the_last_mover():
+    learner = StubStrategy()
+    wins, losses, draws = SelfPlay(learner, learner, parallel=2, start_position=drawn_position).run(2)
+    assert (wins, losses, draws) == (0, 0, 2)
+    for g in learner.games:
+        assert len(g['moves']) == 1
+        assert g['absorbed'] == Board.STONE_BLACK
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+shortcuts = pytest.importorskip('pybrain.tools.shortcuts')
+
+from tentacle.board import Board
+from tentacle.game import Game
+from tentacle.strategy_ann import StrategyANN
+
+
+@pytest.mark.parametrize('stones', [0, 1, 6])
+def test_child_values_match_full_forward(stones):
+    np.random.seed(stones)
+    s = StrategyANN.__new__(StrategyANN)  # only the input encoding is needed
+    features = Board.BOARD_SIZE_SQ * 2 + 2
+    net = shortcuts.buildNetwork(features, 8, 8, 1, bias=True)
+    net._setParameters(np.random.randn(len(net.params)))
+
+    b = Board()
+    for _ in range(stones):
+        b.push(b.random_empty())
+    moves, _, _ = Game.possible_moves(b)
+    values = StrategyANN.child_values(net, s.get_input_values(b), moves)
+
+    assert values.shape == (len(moves),)
+    full = [net.activate(s.get_input_values(child))[0] for child in moves]
+    assert np.allclose(values, full)
@@ -0,0 +1,56 @@
+import numpy as np
+from scipy.special import expit
+
+from tentacle.board import Board
+from tentacle.strategy import StrategyTD
+
+FEATURES = Board.BOARD_SIZE_SQ * 2 + 2
+
+
+def played(moves):
+    b = Board()
+    for loc in moves:
+        b.push(loc)
+    return b
+
+
+def test_move_values_match_board_value():
+    np.random.seed(0)
+    s = StrategyTD(FEATURES, 20)
+    b = played([112, 113, 97])
+    who = b.whose_turn()
+    locs = b.empties()
+    values = s.move_values(b, locs, who)
+    expected = [s.board_value(b.child(loc, who), None) for loc in locs]
+    assert np.allclose(values, np.ravel(expected))
+
+
+def reference_update(s, old, new, reward):
+    '''the TD(lambda) step on copies of the weights and traces, as written out in full'''
+    hw, ow = s.hidden_weights.copy(), s.output_weights.copy()
+
+    def forward(board):
+        x = s.get_input_values(board)
+        h = expit(hw.dot(x))
+        h[0] = 1.
+        return x, h, expit(ow.dot(h))
+
+    x, h, out = forward(old)
+    dw2 = out * (1 - out) * h
+    ot = s.lambdaa * s.output_traces + dw2
+    ht = s.lambdaa * s.hidden_traces + np.outer(dw2 * (1 - h) * ow, x)
+    _, _, new_out = forward(new)
+    delta = reward + s.gamma * new_out - out
+    return hw + s.alpha * delta * ht, ow + s.beta * delta * ot
+
+
+def test_update_steps_match_td_lambda():
+    np.random.seed(1)
+    s = StrategyTD(FEATURES, 20)
+    boards = [played([112]), played([112, 113]), played([112, 113, 97]), played([112, 113, 97, 98])]
+    # consecutive steps, each must see the weights left by the one before
+    for (old, new), reward in zip(zip(boards, boards[1:]), [0, 0, 2]):
+        hw, ow = reference_update(s, old, new, reward)
+        s._update_impl(old, new, reward)
+        assert np.allclose(s.hidden_weights, hw)
+        assert np.allclose(s.output_weights, ow)
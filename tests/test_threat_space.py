@@ -0,0 +1,42 @@
+from tentacle.board import Board
+from tentacle.threat_space import ThreatSolver
+
+BLACK, WHITE = Board.STONE_BLACK, Board.STONE_WHITE
+
+
+def position(black, white):
+    b = Board()
+    for row, col in black:
+        b.move(row, col, BLACK)
+    for row, col in white:
+        b.move(row, col, WHITE)
+    return b
+
+
+def test_finds_known_vcf():
+    # a closed three on row 7 and a two on column 6: the four at (7, 6) forces
+    # the block at (7, 7), then (6, 6) or (10, 6) makes an open four
+    b = position([(7, 3), (7, 4), (7, 5), (8, 6), (9, 6)], [(7, 2), (3, 3), (11, 11)])
+    assert not b.winning_moves(BLACK)
+    solver = ThreatSolver()
+    for _ in range(Board.WIN_STONE_NUM):
+        loc = solver.vcf(b, BLACK)
+        assert loc is not None
+        if b.push(loc, BLACK):
+            break
+        blocks = b.winning_moves(BLACK)
+        assert blocks, 'every attacking move must be a four'
+        b.push(blocks[0], WHITE)
+    assert b.winner == BLACK
+
+
+def test_no_vcf_without_threats():
+    b = position([(7, 7), (7, 8)], [(8, 7)])
+    solver = ThreatSolver()
+    assert solver.vcf(b, BLACK) is None
+    assert solver.solve(b, BLACK) is None
+
+
+def test_takes_immediate_five():
+    b = position([(7, 3), (7, 4), (7, 5), (7, 6)], [(7, 2), (8, 8), (9, 9)])
+    assert ThreatSolver().solve(b, BLACK) == 7 * Board.BOARD_SIZE + 7